@@ -0,0 +1,117 @@
+"""Stress check: concurrent buyers racing for one balance must never overdraw it or be charged twice.
+
+    python -m benchmarks.concurrent_buyers [--db site.db] [--processes 8] [--attempts 20] [--copies 10]
+
+Runs against a copy of --db. A new customer gets an opening credit worth exactly --copies copies of the cheapest
+game; --processes processes then try --attempts purchases each through purchases.checkout, every idempotency
+key being submitted twice. Afterwards exactly --copies purchases must exist, each charged once, the balance must
+be zero, and the balance must equal both the plain sum of the ledger and the balance after compaction. Any
+mismatch exits with status 1.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from sqlalchemy import text
+
+
+def _app(db_path):
+    from game_store import create_app
+    return create_app('game_store.config.Config', SQLALCHEMY_DATABASE_URI='sqlite:///' + db_path)
+
+
+def _buyer(args):
+    db_path, customer_id, game_id, keys = args
+    from game_store.purchases import checkout, InsufficientFunds
+    app = _app(db_path)
+    refused = 0
+    with app.app_context():
+        for key in keys:
+            try:
+                checkout(customer_id, {game_id: 1}, key)
+            except InsufficientFunds:
+                refused += 1
+    return refused
+
+
+def _setup(app, copies):
+    from game_store import db
+    from game_store.ledger import credit
+    from game_store.models import Customer, Game
+    with app.app_context():
+        game = Game.query.order_by(Game.price, Game.id).first()
+        name = uuid.uuid4().hex[:12]
+        customer = Customer(username=name, email=f'{name}@example.com', password='-', balance=game.price * copies)
+        db.session.add(customer)
+        db.session.flush()
+        credit(customer.id, customer.balance, 'opening')
+        db.session.commit()
+        ids = customer.id, game.id, game.price
+        db.session.remove()
+    return ids
+
+
+def _check(app, customer_id, copies, price):
+    from game_store import db
+    from game_store.ledger import balance, compact, to_cents
+    failures = []
+    with app.app_context():
+        query = lambda sql: db.session.execute(text(sql), {'customer_id': customer_id}).scalar()
+        purchases = query('SELECT count(*) FROM purchase WHERE customer_id = :customer_id')
+        debits = query("SELECT count(*) FROM ledger_entry WHERE customer_id = :customer_id AND kind = 'purchase'")
+        ledger_cents = query('SELECT sum(cents) FROM ledger_entry WHERE customer_id = :customer_id')
+        before = balance(customer_id)
+        compact()
+        after = balance(customer_id)
+        db.session.remove()
+    if purchases != copies:
+        failures.append(f'{purchases} purchases, expected {copies}')
+    if debits != purchases:
+        failures.append(f'{debits} purchase debits for {purchases} purchases')
+    if to_cents(before) != ledger_cents:
+        failures.append(f'balance {before} does not match the ledger sum {ledger_cents / 100}')
+    if before != after:
+        failures.append(f'balance {before} changed to {after} after compaction')
+    if before != 0:
+        failures.append(f'final balance {before}, expected 0 after {copies} purchases at {price}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(__file__), '..', 'game_store', 'site.db'))
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=20, help='Purchases tried by every process.')
+    parser.add_argument('--copies', type=int, default=10, help='How many purchases the opening credit covers.')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'stress.db')
+    shutil.copy(args.db, db_path)
+    try:
+        customer_id, game_id, price = _setup(_app(db_path), args.copies)
+        # Every key appears twice, in different processes, to exercise the idempotent resubmit as well.
+        keys = [f'stress-{n}' for n in range(args.processes * args.attempts // 2)] * 2
+        batches = [(db_path, customer_id, game_id, keys[n::args.processes]) for n in range(args.processes)]
+        started = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(args.processes) as pool:
+            refused = sum(pool.map(_buyer, batches))
+        elapsed = time.perf_counter() - started
+        failures = _check(_app(db_path), customer_id, args.copies, price)
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f'{args.processes} processes x {args.attempts} attempts in {elapsed:.2f} s: '
+          f'{refused} refused for insufficient funds')
+    for failure in failures:
+        print('FAIL', failure)
+    if failures:
+        raise SystemExit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
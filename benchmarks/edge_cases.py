@@ -0,0 +1,86 @@
+"""Regression checks for inputs that once made the store fail.
+
+    python -m benchmarks.edge_cases [--db site.db] [--check catalog_negative_cursor ...]
+
+Every check runs against a copy of --db through the Flask test client and prints ok or FAIL with the reason.
+Any failure exits with status 1.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+
+CHECKS = {}
+
+
+def check(function):
+    CHECKS[function.__name__] = function
+    return function
+
+
+def _expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+@check
+def catalog_negative_cursor(app, client):
+    first = client.get('/catalog')
+    for after in (-1, -2, -5, -10 ** 6):
+        response = client.get(f'/catalog?after={after}')
+        _expect(response.status_code == 200, f'/catalog?after={after} returned {response.status_code}')
+        _expect(response.data == first.data, f'/catalog?after={after} is not the first page')
+
+
+@check
+def ledger_rejects_non_positive_amounts(app, client):
+    from game_store import db
+    from game_store.ledger import balance, credit, debit
+    from game_store.models import Customer
+    with app.app_context():
+        customer_id = db.session.query(Customer.id).order_by(Customer.id).limit(1).scalar()
+        before = balance(customer_id)
+        for move in (credit, debit):
+            for amount in (0, -100, '-0.01', '0.001'):
+                try:
+                    move(customer_id, amount, 'check')
+                except ValueError:
+                    continue
+                finally:
+                    db.session.rollback()
+                raise AssertionError(f'{move.__name__}({customer_id}, {amount!r}) was accepted')
+        _expect(balance(customer_id) == before, f'balance changed from {before} to {balance(customer_id)}')
+        db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(__file__), '..', 'game_store', 'site.db'))
+    parser.add_argument('--check', action='append', choices=sorted(CHECKS))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'edge_cases.db')
+    shutil.copy(args.db, db_path)
+    from game_store import create_app
+    app = create_app('game_store.config.Config', SQLALCHEMY_DATABASE_URI='sqlite:///' + db_path,
+                     WTF_CSRF_ENABLED=False, PAGE_CACHE_ENABLED=False)
+    failed = 0
+    try:
+        for name in args.check or CHECKS:
+            try:
+                CHECKS[name](app, app.test_client())
+            except AssertionError as error:
+                failed += 1
+                print(f'FAIL {name}: {error}')
+            else:
+                print(f'ok   {name}')
+    finally:
+        shutil.rmtree(workdir)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
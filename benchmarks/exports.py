@@ -0,0 +1,79 @@
+"""Peak memory of the streaming history export as the number of exported rows grows.
+
+    python -m benchmarks.generate --out bench.db --purchases 1000000
+    python -m benchmarks.exports --db bench.db [--rows 10000 100000 1000000] [--format csv]
+
+Every size is exported in a fresh process through the admin endpoint (/reports/export/orders.<format>, the
+last N purchases via ?after_id=) and read to the end. The peak RSS gained while exporting must stay within
+--tolerance MiB of the smallest export, otherwise the run exits with status 1.
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from benchmarks.generate import BENCHMARK_PASSWORD
+
+
+def _peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def export(db_path, rows, fmt):
+    connection = sqlite3.connect(db_path)
+    email = connection.execute('SELECT email FROM customer ORDER BY id LIMIT 1').fetchone()[0]
+    high = connection.execute('SELECT max(id) FROM purchase').fetchone()[0] or 0
+    connection.close()
+    from game_store import create_app
+    app = create_app('game_store.config.Config', SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.abspath(db_path),
+                     WTF_CSRF_ENABLED=False, ADMIN_EMAILS=[email], PAGE_CACHE_ENABLED=False)
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': BENCHMARK_PASSWORD})
+    baseline = _peak_rss_mib()
+    started = time.perf_counter()
+    response = client.get(f'/reports/export/orders.{fmt}?after_id={max(high - rows, 0)}', buffered=False)
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code}')
+    size = lines = 0
+    for chunk in response.iter_encoded():
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+    response.close()
+    return {'rows': lines - (fmt == 'csv'), 'bytes': size, 'seconds': time.perf_counter() - started,
+            'rss_gain_mib': _peak_rss_mib() - baseline}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--tolerance', type=float, default=16.0, help='Allowed RSS growth in MiB.')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        print(json.dumps(export(args.db, args.child, args.format)))
+        return
+
+    results = []
+    for rows in sorted(args.rows):
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-m', 'benchmarks.exports', '--db', args.db,
+                                 '--format', args.format, '--child', str(rows)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        results.append(result)
+        print(f"{result['rows']:>9} rows  {result['bytes'] / 2 ** 20:8.1f} MiB out  {result['seconds']:7.2f} s  "
+              f"{result['rows'] / result['seconds'] if result['seconds'] else 0:9.0f} rows/s  "
+              f"peak RSS +{result['rss_gain_mib']:.1f} MiB")
+    growth = results[-1]['rss_gain_mib'] - results[0]['rss_gain_mib']
+    print(f'RSS growth from {results[0]["rows"]} to {results[-1]["rows"]} rows: {growth:.1f} MiB '
+          f'(tolerance {args.tolerance} MiB)')
+    if growth > args.tolerance:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
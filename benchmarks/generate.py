@@ -0,0 +1,135 @@
+"""Generate a deterministic benchmark database.
+
+    python -m benchmarks.generate --out bench.db --customers 10000 --games 100000 --purchases 2000000
+
+The same arguments and --seed always produce the same rows. Every customer's password is BENCHMARK_PASSWORD.
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+from flask_bcrypt import generate_password_hash
+from sqlalchemy import create_engine, text
+from game_store.migrations import upgrade
+
+
+BENCHMARK_PASSWORD = 'benchmark'
+GENRES = ['action-adventure', 'action role-playing', 'first-person shooter', 'third-person shooter', 'platform',
+          'racing', 'sports', 'fighting', 'social simulation', 'strategy', 'puzzle', 'survival horror']
+WORDS = ['Shadow', 'Legend', 'Star', 'Dragon', 'Iron', 'Lost', 'Night', 'Crystal', 'Storm', 'Empire', 'Knight',
+         'Galaxy', 'Racer', 'Quest', 'Tales', 'Odyssey', 'Frontier', 'Rising', 'Chronicles', 'Wars']
+CHUNK = 50000
+
+
+def _chunks(rows, size=CHUNK):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(connection, table, columns, rows):
+    statement = text(f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({", ".join(":" + c for c in columns)})')
+    count = 0
+    for chunk in _chunks(rows):
+        connection.execute(statement, chunk)
+        count += len(chunk)
+    return count
+
+
+def generate(path, customers, publishers, platforms, games, purchases, return_rate, seed):
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine('sqlite:///' + path)
+    password = generate_password_hash(BENCHMARK_PASSWORD).decode('utf-8')
+    epoch = datetime.date(1995, 1, 1)
+    start = datetime.datetime(2019, 1, 1)
+    counts = {}
+    with engine.begin() as connection:
+        connection.exec_driver_sql('PRAGMA journal_mode = WAL')
+        connection.exec_driver_sql('PRAGMA synchronous = OFF')
+        upgrade(connection)
+        counts['publisher'] = _insert(connection, 'publisher', ['id', 'publisher_name'], (
+            {'id': i, 'publisher_name': f'Publisher {i}'} for i in range(1, publishers + 1)))
+        counts['platform'] = _insert(connection, 'platform', ['id', 'platform_name', 'release_date', 'price'], (
+            {'id': i, 'platform_name': f'Platform {i}', 'release_date': str(epoch + datetime.timedelta(days=200 * i)),
+             'price': rng.choice([30, 50, 70, 200, 300])} for i in range(1, platforms + 1)))
+
+        prices = [None]
+
+        def game_rows():
+            for i in range(1, games + 1):
+                name = ' '.join(rng.sample(WORDS, 3))
+                genre = rng.choice(GENRES)
+                release_date = str(epoch + datetime.timedelta(days=rng.randrange(10000)))
+                prices.append(rng.choice([5, 10, 15, 20, 25, 30, 40, 50, 60]))
+                yield {'id': i, 'game_name': f'{name} {i}', 'genre': genre, 'release_date': release_date,
+                       'price': prices[i],
+                       'description': f'{name}: ' + ' '.join(rng.choices(WORDS, k=20)),
+                       'publisher_id': rng.randint(1, publishers), 'poster': f'https://example.com/posters/{i}.jpg'}
+        counts['game'] = _insert(connection, 'game', ['id', 'game_name', 'genre', 'release_date', 'price',
+                                                      'description', 'publisher_id', 'poster'], game_rows())
+        counts['run'] = _insert(connection, 'run', ['platform_id', 'game_id'], (
+            {'platform_id': platform_id, 'game_id': game_id}
+            for game_id in range(1, games + 1)
+            for platform_id in rng.sample(range(1, platforms + 1), rng.randint(1, min(4, platforms)))))
+        counts['customer'] = _insert(connection, 'customer', ['id', 'username', 'email', 'password', 'balance'], (
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password': password,
+             'balance': 1000000} for i in range(1, customers + 1)))
+        connection.execute(text("INSERT INTO ledger_entry (customer_id, cents, kind, date) "
+                                "SELECT id, CAST(balance * 100 AS INTEGER), 'opening', :date FROM customer"),
+                           {'date': str(start)})
+
+        # Customers and games are drawn log-uniformly, so a few accounts have long histories and a few titles
+        # are best sellers, as in a real store.
+        returned = set(rng.sample(range(1, purchases + 1), int(purchases * return_rate)))
+        returned_by = {}
+
+        def purchase_rows():
+            for i in range(1, purchases + 1):
+                customer_id = int(customers ** rng.random())
+                if i in returned:
+                    returned_by[i] = customer_id
+                game_id = int(games ** rng.random())
+                yield {'id': i, 'customer_id': customer_id, 'date': str(start + datetime.timedelta(seconds=i * 30)),
+                       'game_id': game_id, 'qty': rng.choice([1, 1, 1, 2, 3]), 'unit_price': prices[game_id],
+                       'status': 'returned' if i in returned else 'active'}
+        counts['purchase'] = _insert(connection, 'purchase', ['id', 'customer_id', 'date', 'game_id', 'qty',
+                                                              'unit_price', 'status'], purchase_rows())
+        counts['return'] = _insert(connection, 'return', ['customer_id', 'date', 'purchase_id'], (
+            {'customer_id': returned_by[purchase_id], 'purchase_id': purchase_id,
+             'date': str(start + datetime.timedelta(seconds=purchase_id * 30 + 3600))}
+            for purchase_id in sorted(returned_by)))
+    with engine.connect() as connection:
+        connection.exec_driver_sql('ANALYZE')
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default='bench.db')
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--publishers', type=int, default=200)
+    parser.add_argument('--platforms', type=int, default=30)
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--purchases', type=int, default=2000000)
+    parser.add_argument('--return-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = generate(args.out, args.customers, args.publishers, args.platforms, args.games, args.purchases,
+                      args.return_rate, args.seed)
+    for table, count in counts.items():
+        print(f'{table:10} {count:>10}')
+    print(f'generated {args.out} in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Load benchmark for the store's routes.
+
+    python -m benchmarks.harness --db bench.db [--requests 200] [--scenario gamelist --scenario buy ...]
+    python -m benchmarks.harness --db bench.db --http http://127.0.0.1:5000 --processes 4
+    python -m benchmarks.harness --compare benchmarks/results/old.json benchmarks/results/new.json
+
+By default requests go through the Flask test client in this process, against --db. With --http they are sent
+over HTTP by --processes driver processes to a server started separately on the same database
+(GAME_STORE_DATABASE_URI=sqlite:////abs/path/bench.db). The buy and return scenarios write to the database,
+so generate a fresh one (benchmarks.generate) for runs that are meant to be compared.
+"""
+import argparse
+import datetime
+import http.cookiejar
+import json
+import math
+import multiprocessing
+import os
+import re
+import sqlite3
+import subprocess
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from benchmarks.generate import BENCHMARK_PASSWORD
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def sample_context(db_path, requests):
+    connection = sqlite3.connect(db_path)
+    query = lambda sql, *args: connection.execute(sql, args).fetchall()
+    customer_id, email = query('SELECT customer.id, customer.email FROM customer JOIN purchase '
+                               'ON purchase.customer_id = customer.id GROUP BY customer.id '
+                               'ORDER BY count(*) DESC LIMIT 1')[0]
+    game_count = query('SELECT count(*) FROM game')[0][0]
+    middle = query('SELECT release_date, id FROM game ORDER BY release_date DESC, id DESC LIMIT 1 OFFSET ?',
+                   game_count // 2)[0]
+    context = {
+        'customer_id': customer_id,
+        'email': email,
+        'logins': [row[0] for row in query('SELECT email FROM customer ORDER BY id LIMIT ?', requests)],
+        'games': [row[0] for row in query('SELECT game_name FROM game ORDER BY id LIMIT 50')],
+        'publisher_id': query('SELECT publisher_id FROM game GROUP BY publisher_id ORDER BY count(*) DESC LIMIT 1')[0][0],
+        'platform_id': query('SELECT platform_id FROM run GROUP BY platform_id ORDER BY count(*) DESC LIMIT 1')[0][0],
+        'genre': query('SELECT genre FROM game GROUP BY genre ORDER BY count(*) DESC LIMIT 1')[0][0],
+        'deep_cursor': f'{middle[0]}_{middle[1]}',
+        'purchases': [row[0] for row in query("SELECT id FROM purchase WHERE customer_id = ? AND status = 'active' "
+                                              'ORDER BY id DESC LIMIT ?', customer_id, requests)],
+        'dataset': {table: query(f'SELECT count(*) FROM "{table}"')[0][0]
+                    for table in ('customer', 'game', 'run', 'purchase', 'return')},
+    }
+    connection.close()
+    return context
+
+
+# Every scenario is (needs login, function(client, context, i) -> seconds spent on the measured request).
+SCENARIOS = {
+    'gamelist': (False, lambda client, ctx, i: client.get('/gamelist')),
+    'gamelist_deep': (False, lambda client, ctx, i: client.get('/gamelist?after=' + ctx['deep_cursor'])),
+    'catalog_filter': (False, lambda client, ctx, i: client.get(
+        f"/catalog?platform={ctx['platform_id']}&genre={urllib.parse.quote(ctx['genre'])}&year_min=2000")),
+    'show_publisher': (False, lambda client, ctx, i: client.get(f"/show_publisher/{ctx['publisher_id']}")),
+    'show_platform': (False, lambda client, ctx, i: client.get(f"/show_platform/{ctx['platform_id']}")),
+    'show_genre': (False, lambda client, ctx, i: client.get('/show_genre/' + urllib.parse.quote(ctx['genre']))),
+    'search': (False, lambda client, ctx, i: client.get('/search?q=dragon')),
+    'account': (True, lambda client, ctx, i: client.get('/account')),
+    'buy': (True, lambda client, ctx, i: client.post(
+        '/game/' + urllib.parse.quote(ctx['games'][i % len(ctx['games'])]),
+        {'quantity': 1, 'idempotency_key': uuid.uuid4().hex})),
+    'returns': (True, lambda client, ctx, i: client.post(f"/returns/{ctx['purchases'][i % len(ctx['purchases'])]}",
+                                                         {})),
+    'login': (False, lambda client, ctx, i: client.login(ctx['logins'][i % len(ctx['logins'])], logout=True)),
+}
+
+
+class TestClient:
+    def __init__(self):
+        from game_store import app
+        self.client = app.test_client()
+
+    def _timed(self, call, *args, **kwargs):
+        started = time.perf_counter()
+        response = call(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'HTTP {response.status_code}')
+        return elapsed
+
+    def get(self, path):
+        return self._timed(self.client.get, path)
+
+    def post(self, path, data):
+        return self._timed(self.client.post, path, data=data)
+
+    def login(self, email, logout=False):
+        elapsed = self.post('/login', {'email': email, 'password': BENCHMARK_PASSWORD})
+        if logout:
+            self.client.get('/logout')
+        return elapsed
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def _open(self, path, data=None):
+        body = None if data is None else urllib.parse.urlencode(data).encode()
+        with self.opener.open(self.base_url + path, body) as response:
+            return response.read().decode('utf-8', 'replace')
+
+    def get(self, path):
+        started = time.perf_counter()
+        self._open(path)
+        return time.perf_counter() - started
+
+    def post(self, path, data):
+        # The CSRF token comes from an untimed GET of the same page; only the POST is measured.
+        token = CSRF_TOKEN.search(self._open(path))
+        data = dict(data, csrf_token=token.group(1) if token else '')
+        started = time.perf_counter()
+        self._open(path, data)
+        return time.perf_counter() - started
+
+    def login(self, email, logout=False):
+        elapsed = self.post('/login', {'email': email, 'password': BENCHMARK_PASSWORD})
+        if logout:
+            self._open('/logout')
+        return elapsed
+
+
+def _run(client, context, scenario, start, count):
+    needs_login, request = SCENARIOS[scenario]
+    if needs_login:
+        client.login(context['email'])
+    latencies, errors = [], 0
+    for i in range(start, start + count):
+        try:
+            latencies.append(request(client, context, i))
+        except (RuntimeError, urllib.error.URLError):
+            errors += 1
+    return latencies, errors
+
+
+def _http_worker(job):
+    base_url, context, scenario, start, count = job
+    return _run(HttpClient(base_url), context, scenario, start, count)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] if ordered else None
+
+
+def summarize(latencies, errors, seconds):
+    ms = [latency * 1000 for latency in latencies]
+    return {'requests': len(ms), 'errors': errors, 'p50_ms': percentile(ms, 50), 'p99_ms': percentile(ms, 99),
+            'mean_ms': sum(ms) / len(ms) if ms else None, 'throughput_rps': len(ms) / seconds if seconds else None}
+
+
+def run_benchmark(db_path, scenarios, requests, http=None, processes=1):
+    context = sample_context(db_path, requests)
+    if http is None:
+        from game_store import app
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(db_path)
+        app.config['WTF_CSRF_ENABLED'] = False
+    results = {}
+    for scenario in scenarios:
+        started = time.perf_counter()
+        if http is None:
+            latencies, errors = _run(TestClient(), context, scenario, 0, requests)
+        else:
+            share = math.ceil(requests / processes)
+            jobs = [(http, context, scenario, n * share, share) for n in range(processes)]
+            with multiprocessing.Pool(processes) as pool:
+                parts = pool.map(_http_worker, jobs)
+            latencies = [latency for part, _ in parts for latency in part]
+            errors = sum(part_errors for _, part_errors in parts)
+        results[scenario] = summarize(latencies, errors, time.perf_counter() - started)
+        print(f"{scenario:16} p50 {results[scenario]['p50_ms'] or 0:8.2f} ms  p99 {results[scenario]['p99_ms'] or 0:8.2f} ms"
+              f"  {results[scenario]['throughput_rps'] or 0:8.1f} req/s  errors {errors}")
+    return context['dataset'], results
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for scenario, after in new['scenarios'].items():
+        before = old['scenarios'].get(scenario)
+        if not before:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+            if before[key] and after[key]:
+                cells.append(f'{key} {before[key]:.2f} -> {after[key]:.2f} ({(after[key] / before[key] - 1) * 100:+.0f}%)')
+        print(f'{scenario:16} ' + '  '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    parser.add_argument('--http', help='Base URL of a running server; default is the in-process test client.')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--out', help='Result file; default benchmarks/results/<commit>-<time>.json.')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    dataset, scenarios = run_benchmark(args.db, args.scenario or list(SCENARIOS), args.requests, args.http,
+                                       args.processes)
+    commit = _commit()
+    result = {'commit': commit, 'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+              'mode': 'http' if args.http else 'test-client', 'processes': args.processes,
+              'requests': args.requests, 'dataset': dataset, 'scenarios': scenarios}
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'results written to {out}')
+
+
+if __name__ == '__main__':
+    main()
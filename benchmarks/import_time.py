@@ -0,0 +1,52 @@
+"""Import time of the app package, with a budget.
+
+    python -m benchmarks.import_time [--budget 0.65] [--runs 5] [--module game_store]
+
+Times `python -c "import <module>"` in --runs fresh interpreters and reports the fastest and the median run,
+along with the slowest imports made directly by the module in the fastest one (python -X importtime). Exits with
+status 1 when the fastest run exceeds --budget seconds, so the check can gate CI without tripping over one slow
+start.
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(module):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', f'import {module}'],
+                               capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - started
+    # importtime indents every nesting level by two more spaces; 3 are the modules the package itself imports.
+    direct = [(int(cumulative) / 1e6, name) for _, cumulative, indent, name in
+              IMPORT_LINE.findall(completed.stderr) if len(indent) == 3]
+    return elapsed, sorted(direct, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='game_store')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=0.65, help='Allowed import time in seconds.')
+    parser.add_argument('--top', type=int, default=8, help='How many of the slowest imports to list.')
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    fastest, imports = min(runs)
+    print(f'import {args.module}: fastest {fastest:.3f} s, median {statistics.median(r[0] for r in runs):.3f} s '
+          f'over {args.runs} runs (budget {args.budget:.3f} s)')
+    for seconds, name in imports[:args.top]:
+        print(f'  {seconds:7.3f} s  {name}')
+    if fastest > args.budget:
+        print(f'over budget by {fastest - args.budget:.3f} s')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Login throughput, and catalog latency during a login storm, for several password hashing caps.
+
+    python -m benchmarks.generate --out bench.db
+    python -m benchmarks.logins --db bench.db [--concurrency 1 2 4] [--workers 4] [--clients 8] [--requests 400]
+
+For every PASSWORD_HASH_CONCURRENCY value a threaded production server is started on --db. --clients processes
+then log in and out as different customers while one more process requests /gamelist, and the run reports
+login req/s, logins turned away with 503 and the catalog latency seen during the storm. The generated customers'
+hashes use bcrypt's default cost 12; pass --rounds to make every login also rehash in the background.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from benchmarks.harness import sample_context, percentile, _http_worker
+from benchmarks.scaling import start_server, _free_port
+
+
+def _timed(job):
+    started = time.perf_counter()
+    latencies, errors = _http_worker(job)
+    return job[2], latencies, errors, time.perf_counter() - started
+
+
+def storm(base_url, context, clients, requests, catalog_requests):
+    share = math.ceil(requests / clients)
+    jobs = [(base_url, context, 'login', n * share, share) for n in range(clients)]
+    jobs.append((base_url, context, 'gamelist', 0, catalog_requests))
+    with multiprocessing.Pool(len(jobs)) as pool:
+        parts = pool.map(_timed, jobs)
+    logins = [latency for scenario, latencies, _, _ in parts if scenario == 'login' for latency in latencies]
+    login_seconds = max(seconds for scenario, _, _, seconds in parts if scenario == 'login')
+    catalog = [latency for scenario, latencies, _, _ in parts if scenario == 'gamelist' for latency in latencies]
+    return {'login_rps': len(logins) / login_seconds,
+            'login_p50_ms': (percentile(logins, 50) or 0) * 1000,
+            'login_p99_ms': (percentile(logins, 99) or 0) * 1000,
+            'rejected': sum(errors for scenario, _, errors, _ in parts if scenario == 'login'),
+            'catalog_p50_ms': (percentile(catalog, 50) or 0) * 1000,
+            'catalog_p99_ms': (percentile(catalog, 99) or 0) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help='Logins per round, across all clients.')
+    parser.add_argument('--catalog-requests', type=int, default=300)
+    parser.add_argument('--rounds', type=int, help='BCRYPT_LOG_ROUNDS for the server; default keeps the stored cost.')
+    args = parser.parse_args()
+    context = sample_context(args.db, args.requests)
+    print(f'{os.cpu_count()} cores, {args.workers} threaded workers, {args.clients} login clients')
+
+    print(f"{'slots':>5} {'login/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'503s':>6} {'catalog p50':>12} {'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        env = {'GAME_STORE_PASSWORD_HASH_CONCURRENCY': str(concurrency)}
+        if args.rounds:
+            env['GAME_STORE_BCRYPT_LOG_ROUNDS'] = str(args.rounds)
+        port = _free_port()
+        server = start_server(args.db, args.workers, port, args=['--threaded'], env=env)
+        try:
+            result = storm(f'http://127.0.0.1:{port}', context, args.clients, args.requests, args.catalog_requests)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{concurrency:>5} {result['login_rps']:9.1f} {result['login_p50_ms']:9.1f} {result['login_p99_ms']:9.1f} "
+              f"{result['rejected']:>6} {result['catalog_p50_ms']:12.1f} {result['catalog_p99_ms']:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
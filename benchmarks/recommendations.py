@@ -0,0 +1,62 @@
+"""Build time and memory of the "customers also bought" table.
+
+    python -m benchmarks.generate --out bench.db --purchases 1000000
+    python -m benchmarks.recommendations --db bench.db [--new-purchases 1000]
+
+Memory is the peak seen by tracemalloc during a second full build (query rows, sparse matrices and the top-k
+table); numpy and scipy report their allocations to it.
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+from sqlalchemy import text
+from game_store import app, db
+from game_store.recommend import Recommender
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--new-purchases', type=int, default=1000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(args.db)
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        count = lambda table: db.session.execute(text(f'SELECT count(*) FROM {table}')).scalar()
+        print(f"purchases {count('purchase')}, customers {count('customer')}, games {count('game')}")
+        recommender = Recommender()
+
+        started = time.perf_counter()
+        recommender.rebuild()
+        build_seconds = time.perf_counter() - started
+        # tracemalloc slows allocation-heavy code several times over, so memory is measured on a second build.
+        tracemalloc.start()
+        recommender.rebuild()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        owned = recommender.owned
+        owned_bytes = owned.data.nbytes + owned.indices.nbytes + owned.indptr.nbytes
+        print(f'full build       {build_seconds:8.2f} s   peak {peak / 2 ** 20:8.1f} MiB')
+        print(f'kept in memory   owned matrix {owned_bytes / 2 ** 20:.1f} MiB ({owned.nnz} pairs), '
+              f'top-k table {recommender.top.nbytes / 2 ** 20:.1f} MiB')
+
+        customers, games = owned.shape
+        rows = [(rng.randrange(1, customers), rng.randrange(1, games)) for _ in range(args.new_purchases)]
+        started = time.perf_counter()
+        recommender.apply(rows)
+        print(f'incremental      {time.perf_counter() - started:8.2f} s   for {args.new_purchases} new purchases')
+
+        game_ids = [rng.randrange(1, games) for _ in range(args.lookups)]
+        started = time.perf_counter()
+        for game_id in game_ids:
+            recommender.similar(game_id)
+        print(f'lookup           {(time.perf_counter() - started) / args.lookups * 1e6:8.2f} us per game')
+
+
+if __name__ == '__main__':
+    main()
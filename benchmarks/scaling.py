@@ -0,0 +1,84 @@
+"""Throughput of the catalog routes against the production server as the number of workers grows.
+
+    python -m benchmarks.scaling --db bench.db [--workers 1 2 4 8] [--clients 16] [--requests 2000]
+
+For every worker count a fresh `python -m game_store.server` is started on --db and driven over HTTP by
+--clients driver processes (benchmarks.harness). Only read-only scenarios are run, so one database serves every
+round. Each round starts with an untimed warm-up pass (--warmup requests per scenario) so that first-request
+work in every worker, such as on-demand poster fetches, is not measured. The drivers share the machine with the
+server, so leave them some cores when reading the numbers.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from benchmarks.harness import run_benchmark
+
+
+CATALOG_SCENARIOS = ['gamelist', 'gamelist_deep', 'catalog_filter', 'show_publisher', 'show_platform', 'show_genre']
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, workers, port, timeout=120, args=(), env=None):
+    env = dict(os.environ, **(env or {}), GAME_STORE_DATABASE_URI='sqlite:///' + os.path.abspath(db_path))
+    server = subprocess.Popen([sys.executable, '-W', 'ignore', '-m', 'game_store.server', '--workers', str(workers),
+                               '--bind', f'127.0.0.1:{port}', *args], env=env)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/about', timeout=5):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError(f'server exited with status {server.returncode}')
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('server did not start in time')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--scenario', action='append', choices=CATALOG_SCENARIOS)
+    args = parser.parse_args()
+    scenarios = args.scenario or CATALOG_SCENARIOS
+    print(f'{os.cpu_count()} cores, {args.clients} client processes')
+
+    throughput = {}
+    for workers in args.workers:
+        port = _free_port()
+        print(f'--- {workers} workers')
+        server = start_server(args.db, workers, port)
+        try:
+            print('warm-up')
+            run_benchmark(args.db, scenarios, args.warmup, http=f'http://127.0.0.1:{port}', processes=args.clients)
+            print('measured')
+            _, results = run_benchmark(args.db, scenarios, args.requests, http=f'http://127.0.0.1:{port}',
+                                       processes=args.clients)
+        finally:
+            server.terminate()
+            server.wait()
+        throughput[workers] = {scenario: result['throughput_rps'] or 0 for scenario, result in results.items()}
+
+    base = args.workers[0]
+    print(f"\n{'req/s':16}" + ''.join(f'{workers:>10} w' for workers in args.workers) + '   speedup')
+    for scenario in scenarios:
+        row = [throughput[workers][scenario] for workers in args.workers]
+        speedup = row[-1] / throughput[base][scenario] if throughput[base][scenario] else 0
+        print(f'{scenario:16}' + ''.join(f'{value:12.1f}' for value in row) + f'   {speedup:6.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Queries per authenticated request on the catalog routes, with and without the session user cache.
+
+    python -m benchmarks.user_cache [--requests 50]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from sqlalchemy import event
+from game_store import app, db
+from game_store.models import Customer
+
+
+ROUTES = ['/', '/gamelist', '/catalog', '/genres', '/platforms', '/publisher',
+          '/show_publisher/1', '/show_platform/12', '/show_genre/action-adventure']
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def measure(enabled, customer_id, requests):
+    app.config['USER_CACHE_ENABLED'] = enabled
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(customer_id)
+        session['_fresh'] = True
+    counter = QueryCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    results = {}
+    try:
+        for route in ROUTES:
+            client.get(route)
+            counter.count = 0
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get(route)
+            results[route] = (counter.count / requests, (time.perf_counter() - started) / requests * 1000)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', counter)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(app.root_path, 'site.db'), os.path.join(workdir, 'site.db'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'site.db')
+    try:
+        with app.app_context():
+            customer_id = db.session.query(Customer.id).order_by(Customer.id).limit(1).scalar()
+            uncached = measure(False, customer_id, args.requests)
+            cached = measure(True, customer_id, args.requests)
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"{'route':32} {'queries off':>12} {'queries on':>11} {'saved':>6} {'ms off':>8} {'ms on':>8}")
+    for route in ROUTES:
+        (queries_off, ms_off), (queries_on, ms_on) = uncached[route], cached[route]
+        print(f"{route:32} {queries_off:12.2f} {queries_on:11.2f} {queries_off - queries_on:6.2f} "
+              f"{ms_off:8.2f} {ms_on:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,14 @@
+import os
+import sqlite3
 from flask import Flask
 from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = '5791628bb0b13ce0c676dfde280ba245'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
-app.app_context().push()
+app.config.from_object(os.environ.get('GAME_STORE_CONFIG', 'game_store.config.Config'))
 db = SQLAlchemy(app)
 bcrypt = Bcrypt(app)
 login_manager = LoginManager(app)
@@ -15,6 +16,33 @@ login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
 
 
+# Every module registers its routes, hooks and config defaults on the one app above when the package is imported,
+# so a process has exactly one app. create_app() applies a config object (a class or its import path) on top of
+# those defaults and returns it; call it once, before the first request. The engine is created lazily from the
+# config, on first use.
+def create_app(config='game_store.config.DevelopmentConfig', **settings):
+    app.config.from_object(config)
+    app.config.update(settings)
+    return app
 
-from game_store import routes
 
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        for name, value in app.config['SQLITE_PRAGMAS'].items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+
+# A forked child must never use the connections it inherited: the parent's SQLite handles and their locks are
+# not valid across fork. Dropping the pool without closing them leaves the parent's connections alone.
+def _dispose_inherited_engine():
+    if 'sqlalchemy' in app.extensions:
+        db.get_engine(app).dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_inherited_engine)
+
+
+from game_store import routes, api, reports, exports, posters, notifications, commands, metrics
@@ -0,0 +1,150 @@
+import datetime
+import decimal
+import gzip
+import hashlib
+import json
+from flask import Blueprint, request, abort
+from sqlalchemy import select, tuple_
+from game_store import app, db
+from game_store.changes import current_version
+from game_store.models import Game, Publisher, Platform, Run, CatalogChange
+
+
+app.config.setdefault('API_PAGE_SIZE', 100)
+app.config.setdefault('API_MAX_PAGE_SIZE', 1000)
+app.config.setdefault('API_GZIP_LEVEL', 6)
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Resource name -> (table, primary key columns). Lists are paged by the primary key, so ?after= is the key of
+# the last row of the previous page: "17" for a game, "3_17" (platform_id, game_id) for a run.
+RESOURCES = {
+    'games': (Game.__table__, ('id',)),
+    'publishers': (Publisher.__table__, ('id',)),
+    'platforms': (Platform.__table__, ('id',)),
+    'runs': (Run.__table__, ('platform_id', 'game_id')),
+}
+CHANGE_RESOURCES = {'game': 'games', 'publisher': 'publishers', 'platform': 'platforms', 'run': 'runs'}
+
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _rows(statement):
+    return [dict(row._mapping) for row in db.session.execute(statement)]
+
+
+def _limit():
+    limit = request.args.get('limit', app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, app.config['API_MAX_PAGE_SIZE']))
+
+
+def _parse_after(after, size):
+    try:
+        values = tuple(int(part) for part in after.split('_'))
+    except (AttributeError, ValueError):
+        return None
+    return values if len(values) == size else None
+
+
+# Rows come straight from Core selects, so a page of a thousand games is one query and no ORM objects. The
+# ETag is the catalog version plus the request URL: it is known before any catalog query runs, so a client
+# whose copy is current gets its 304 for the price of the version lookup. The gzip representation gets its
+# own tag, as a strong ETag has to identify the exact bytes.
+def _respond(build):
+    version = current_version()
+    compress = request.accept_encodings['gzip'] > 0
+    etag = hashlib.sha1(f'{version}:{request.full_path}'.encode()).hexdigest() + ('-gzip' if compress else '')
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        body = json.dumps(build(version), default=_default, ensure_ascii=False, separators=(',', ':')).encode()
+        if compress:
+            body = gzip.compress(body, app.config['API_GZIP_LEVEL'])
+        response = app.response_class(body, mimetype='application/json')
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@api.route('/<resource>')
+def collection(resource):
+    if resource not in RESOURCES:
+        abort(404)
+    table, key = RESOURCES[resource]
+    limit = _limit()
+    after = _parse_after(request.args.get('after'), len(key))
+
+    def build(version):
+        columns = [table.c[name] for name in key]
+        statement = select(table).order_by(*columns).limit(limit + 1)
+        if after is not None:
+            statement = statement.where(tuple_(*columns) > tuple_(*after))
+        items = _rows(statement)
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = '_'.join(str(items[-1][name]) for name in key)
+        return {'version': version, 'items': items, 'next': next_cursor}
+    return _respond(build)
+
+
+@api.route('/games/<int:game_id>')
+def game(game_id):
+    def build(version):
+        rows = _rows(select(Game.__table__).where(Game.id == game_id))
+        if not rows:
+            abort(404)
+        rows[0]['platforms'] = [platform_id for platform_id, in db.session.execute(
+            select(Run.platform_id).where(Run.game_id == game_id).order_by(Run.platform_id))]
+        return {'version': version, 'item': rows[0]}
+    return _respond(build)
+
+
+# Everything that changed after ?since=, collapsed to the current state of each row: rows that still exist are
+# returned whole under "upserts" and rows that are gone are listed under "deletes". A consumer applies both and
+# stores "version" for its next call; while "more" is true there are further changes to fetch right away.
+@api.route('/changes')
+def changes():
+    since = request.args.get('since', 0, type=int)
+    limit = _limit()
+
+    def build(version):
+        log = db.session.execute(select(CatalogChange.version, CatalogChange.table_name, CatalogChange.row_id,
+                                        CatalogChange.ref_id)
+                                 .where(CatalogChange.version > since)
+                                 .order_by(CatalogChange.version).limit(limit + 1)).all()
+        more = len(log) > limit
+        log = log[:limit]
+        changed = {name: set() for name in RESOURCES}
+        for row in log:
+            changed[CHANGE_RESOURCES[row.table_name]].add(
+                (row.ref_id, row.row_id) if row.table_name == 'run' else row.row_id)
+
+        upserts, deletes = {}, {}
+        for name, keys in changed.items():
+            if name == 'runs':
+                game_ids = {game_id for _, game_id in keys}
+                present = {(row['platform_id'], row['game_id']): row for row in
+                           _rows(select(Run.__table__).where(Run.game_id.in_(game_ids)))} if game_ids else {}
+                upserts[name] = [present[key] for key in sorted(keys) if key in present]
+                deletes[name] = [{'platform_id': platform_id, 'game_id': game_id}
+                                 for platform_id, game_id in sorted(keys) if (platform_id, game_id) not in present]
+            else:
+                table = RESOURCES[name][0]
+                present = {row['id']: row for row in _rows(select(table).where(table.c.id.in_(keys)))} if keys else {}
+                upserts[name] = [present[key] for key in sorted(keys) if key in present]
+                deletes[name] = [key for key in sorted(keys) if key not in present]
+        return {'since': since, 'version': log[-1].version if log else version, 'more': more,
+                'upserts': upserts, 'deletes': deletes}
+    return _respond(build)
+
+
+app.register_blueprint(api)
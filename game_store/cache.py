@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from game_store import app, db
+from game_store.changes import current_version
+from game_store.models import Game, Publisher, Platform
+
+
+app.config.setdefault('CATALOG_CACHE_SIZE', 256)
+app.config.setdefault('CATALOG_CACHE_TTL', 300)
+app.config.setdefault('CATALOG_CACHE_CHECK_INTERVAL', 1.0)
+
+
+# An LRU of catalog reference data with a TTL per entry. The whole cache is dropped whenever the catalog version
+# (see changes.py) moves, which every worker process notices through the shared SQLite file within
+# CATALOG_CACHE_CHECK_INTERVAL seconds. Values are plain rows, never ORM instances, so they are safe to share
+# between requests and sessions.
+class CatalogCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.version = None
+        self.checked = 0.0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _sync_version(self):
+        now = time.monotonic()
+        if self.version is not None and now - self.checked < app.config['CATALOG_CACHE_CHECK_INTERVAL']:
+            return
+        version = current_version()
+        with self.lock:
+            self.checked = now
+            if version != self.version:
+                if self.entries:
+                    self.invalidations += 1
+                self.entries.clear()
+                self.version = version
+
+    def get(self, key, load):
+        self._sync_version()
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = load()
+        with self.lock:
+            self.entries[key] = (value, now + app.config['CATALOG_CACHE_TTL'])
+            self.entries.move_to_end(key)
+            while len(self.entries) > app.config['CATALOG_CACHE_SIZE']:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'invalidations': self.invalidations, 'size': len(self.entries),
+                    'version': self.version}
+
+
+catalog_cache = CatalogCache()
+
+
+def all_publishers():
+    return catalog_cache.get('publishers', lambda: db.session.query(
+        Publisher.id, Publisher.publisher_name).order_by(Publisher.id).all())
+
+
+def all_platforms():
+    return catalog_cache.get('platforms', lambda: db.session.query(
+        Platform.id, Platform.platform_name, Platform.release_date, Platform.price).order_by(Platform.id).all())
+
+
+def all_genres():
+    return catalog_cache.get('genres', lambda: [
+        genre for genre, in db.session.query(Game.genre).distinct().order_by(Game.genre)])
@@ -0,0 +1,17 @@
+from flask import session
+
+
+# The cart lives in the signed session cookie as {game id: quantity}; keys are strings because the
+# session is serialized as JSON.
+def get_cart():
+    return {int(game_id): qty for game_id, qty in session.get('cart', {}).items()}
+
+
+def add_to_cart(game_id, qty):
+    cart = session.get('cart', {})
+    cart[str(game_id)] = cart.get(str(game_id), 0) + qty
+    session['cart'] = cart
+
+
+def clear_cart():
+    session.pop('cart', None)
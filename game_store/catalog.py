@@ -0,0 +1,47 @@
+import datetime
+from flask import request, url_for
+from sqlalchemy import tuple_
+from sqlalchemy.orm import contains_eager
+from game_store import app
+from game_store.models import Game, Publisher
+
+
+app.config.setdefault('GAMES_PER_PAGE', 20)
+
+
+def games_query():
+    return Game.query.outerjoin(Publisher, Game.publisher_id == Publisher.id) \
+        .options(contains_eager(Game.publisher))
+
+
+def make_cursor(game):
+    return f"{game.release_date.isoformat()}_{game.id}"
+
+
+def parse_cursor(cursor):
+    try:
+        release_date, game_id = cursor.split('_')
+        return datetime.date.fromisoformat(release_date), int(game_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+# Keyset pagination by (release_date, id), newest first: every page is an index range scan of
+# per_page + 1 rows, so the cost of a page does not depend on how deep into the catalog it is.
+# key names the columns the query is ordered by; they must hold the game's release date and id, so that the
+# cursor made from a game matches. A platform's listing uses the copies on run, which its index covers.
+def catalog_page(query, cursor=None, per_page=None, key=(Game.release_date, Game.id)):
+    per_page = per_page or app.config['GAMES_PER_PAGE']
+    position = parse_cursor(cursor)
+    if position is not None:
+        query = query.filter(tuple_(*key) < position)
+    games = query.order_by(*(column.desc() for column in key)).limit(per_page + 1).all()
+    next_cursor = make_cursor(games[per_page - 1]) if len(games) > per_page else None
+    return games[:per_page], next_cursor
+
+
+@app.template_global()
+def page_url(cursor):
+    args = request.args.to_dict()
+    args['after'] = cursor
+    return url_for(request.endpoint, **request.view_args, **args)
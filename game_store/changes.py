@@ -0,0 +1,17 @@
+from sqlalchemy import text
+from game_store import db
+from game_store.models import CatalogChange
+
+
+# Every write to a catalog table appends a row to catalog_change from a trigger, so bulk Core writes and other
+# processes are covered too. The AUTOINCREMENT key is the catalog version: it only ever grows, and anything
+# derived from the catalog can catch up by reading the changes after the version it was built from.
+# Migration 7 installs the table and its triggers; for run rows row_id is the game and ref_id the platform.
+def current_version():
+    version = db.session.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'catalog_change'")).scalar()
+    return version or 0
+
+
+def changes_since(version, limit=None):
+    query = CatalogChange.query.filter(CatalogChange.version > version).order_by(CatalogChange.version)
+    return query.limit(limit).all() if limit else query.all()
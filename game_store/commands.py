@@ -0,0 +1,130 @@
+import datetime
+import json
+import os
+import signal
+import click
+from sqlalchemy import text
+from game_store import app, db
+from game_store.models import Game, Publisher, Platform, Run
+from game_store.importer import import_catalog, MODELS
+from game_store.search import install_search
+from game_store.migrations import upgrade, schema_version, LATEST_VERSION
+from game_store.queryplans import check_query_plans
+from game_store.ledger import compact
+from game_store.reports import rebuild_reports
+from game_store.posters import poster_fetcher
+from game_store.jobs import Worker, queue_stats
+
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'data', 'catalog.json')
+CATALOG_TABLES = ((Publisher, 'publishers'), (Platform, 'platforms'), (Game, 'games'), (Run, 'runs'))
+
+
+def _parse_row(row):
+    if 'release_date' in row:
+        row = dict(row, release_date=datetime.date.fromisoformat(row['release_date']))
+    return row
+
+
+@app.cli.command('seed-catalog')
+@click.option('--path', default=CATALOG_PATH, show_default=True, help='JSON file with the seed catalog.')
+def seed_catalog(path):
+    """Load the seed catalog with Core bulk inserts, skipping rows that already exist."""
+    with open(path, encoding='utf-8') as f:
+        catalog = json.load(f)
+    upgrade(db.session.connection())
+    for model, key in CATALOG_TABLES:
+        rows = [_parse_row(row) for row in catalog.get(key, [])]
+        if rows:
+            db.session.execute(model.__table__.insert().prefix_with('OR IGNORE'), rows)
+        click.echo(f'{key}: {len(rows)}')
+    db.session.commit()
+
+
+@app.cli.command('import-catalog')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--kind', type=click.Choice(sorted(MODELS)), help='Row kind for records without a "kind" field.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows per committed chunk.')
+@click.option('--source', help='Name the resume checkpoint is stored under. Defaults to PATH.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and import from the first record.')
+def import_catalog_command(path, fmt, kind, chunk_size, source, restart):
+    """Stream a CSV/JSONL catalog into the database with chunked upserts."""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    stats = import_catalog(path, fmt, kind, chunk_size, source, restart,
+                           report=lambda position, rate: click.echo(f'{position} records, {rate:.0f} rows/s'))
+    for error in stats['errors']:
+        click.echo(error, err=True)
+    click.echo(f"imported {stats['imported']} rows (rejected {stats['rejected']}, resumed from "
+               f"{stats['resumed_from']}) in {stats['seconds']:.1f}s, {stats['rows_per_second']:.0f} rows/s")
+
+
+@app.cli.command('install-search')
+def install_search_command():
+    """Create the game_fts full-text index with its sync triggers and rebuild it from the game table."""
+    with db.engine.begin() as connection:
+        install_search(connection)
+
+
+@app.cli.command('db-upgrade')
+def db_upgrade():
+    """Apply pending schema migrations."""
+    with db.engine.begin() as connection:
+        version = upgrade(connection, report=lambda version, description: click.echo(f'{version}: {description}'))
+    click.echo(f'schema version {version} (latest {LATEST_VERSION})')
+
+
+@app.cli.command('db-version')
+def db_version():
+    """Show the schema version of the database."""
+    with db.engine.connect() as connection:
+        click.echo(f'schema version {schema_version(connection)} (latest {LATEST_VERSION})')
+
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if any query issued by the store's pages and forms scans a large table or sorts its rows."""
+    checked, failures = check_query_plans()
+    for statement, problems in failures:
+        click.echo(' '.join(statement.split()), err=True)
+        for problem in problems:
+            click.echo(f'    {problem}', err=True)
+    click.echo(f'{checked} statements checked, {len(failures)} full scans')
+    if failures:
+        raise SystemExit(1)
+
+
+@app.cli.command('compact-ledger')
+def compact_ledger():
+    """Write balance snapshots for customers with ledger entries since the last compaction."""
+    click.echo(f'{compact()} balance snapshots written')
+
+
+@app.cli.command('rebuild-reports')
+def rebuild_reports_command():
+    """Recompute the sales summary tables from the purchase and return tables."""
+    with db.engine.begin() as connection:
+        rebuild_reports(connection)
+        days = connection.execute(text('SELECT count(*) FROM sales_day')).scalar()
+    click.echo(f'sales summaries rebuilt, {days} days')
+
+
+@app.cli.command('fetch-posters')
+@click.option('--retry-failed', is_flag=True, help='Retry failed posters now instead of after their backoff.')
+def fetch_posters(retry_failed):
+    """Download every game poster not cached yet and write its thumbnails."""
+    stats = poster_fetcher.fetch_all(retry_failed)
+    click.echo(f"{stats['fetched']} posters cached, {stats['failed']} failed")
+
+
+@app.cli.command('worker')
+@click.option('--threads', type=int, help='Worker threads; defaults to JOB_WORKER_THREADS.')
+@click.option('--drain', is_flag=True, help='Exit once no job is due instead of polling for new ones.')
+def worker_command(threads, drain):
+    """Run queued background jobs (receipts, welcome mail, ledger compaction) until interrupted."""
+    worker = Worker(threads)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    click.echo(f'{worker.threads} worker threads, {queue_stats()["queued"]} jobs queued')
+    stats = worker.run(drain)
+    click.echo(f"{stats['succeeded']} jobs done, {stats['failed']} failed attempts, "
+               f"{queue_stats()['failed']} jobs given up")
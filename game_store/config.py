@@ -0,0 +1,31 @@
+import os
+from sqlalchemy.pool import QueuePool
+
+
+class Config:
+    SECRET_KEY = os.environ.get('GAME_STORE_SECRET_KEY', '5791628bb0b13ce0c676dfde280ba245')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('GAME_STORE_DATABASE_URI', 'sqlite:///site.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    # Run on every new SQLite connection, in this order. WAL lets readers work while a purchase is being written;
+    # with it, synchronous = NORMAL only risks the last commits on power loss, never corruption. busy_timeout is
+    # how long a writer waits for the lock before purchases.py's own retries take over.
+    SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000}
+    # bcrypt cost (log2 of the rounds) for new hashes; stored hashes with another cost are rehashed after login.
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('GAME_STORE_BCRYPT_LOG_ROUNDS', 12))
+    # How many bcrypt computations may run at once on this machine, across all worker processes.
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('GAME_STORE_PASSWORD_HASH_CONCURRENCY',
+                                                   max(1, (os.cpu_count() or 2) // 2)))
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+# Flask-SQLAlchemy opens a new SQLite connection per session unless a pool size is given; a pool keeps them,
+# along with SQLite's page cache and the pragmas above. Background threads (posters, recommendations) check
+# connections out too, so they must not be tied to the thread that opened them.
+class ProductionConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': QueuePool, 'pool_size': 4, 'max_overflow': 4, 'pool_timeout': 10,
+                                 'connect_args': {'check_same_thread': False}}
+    SQLITE_PRAGMAS = dict(Config.SQLITE_PRAGMAS, cache_size=-16000, mmap_size=256 * 2 ** 20)
@@ -0,0 +1,94 @@
+import csv
+import datetime
+import decimal
+import io
+import json
+from flask import request, Response, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import select
+from game_store import app, db
+from game_store.models import Purchase, Return, Game
+from game_store.users import admin_required
+
+
+app.config.setdefault('EXPORT_YIELD_PER', 1000)
+
+MIMETYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+
+def _orders():
+    return Purchase, select(Purchase.id, Purchase.date, Purchase.customer_id, Purchase.game_id, Game.game_name,
+                            Purchase.qty, (Purchase.unit_price * Purchase.qty).label('amount'), Purchase.status) \
+        .outerjoin(Game, Game.id == Purchase.game_id)
+
+
+def _returns():
+    return Return, select(Return.id, Return.date, Return.customer_id, Return.purchase_id, Purchase.game_id,
+                          Game.game_name, Purchase.qty, (Purchase.unit_price * Purchase.qty).label('amount')) \
+        .outerjoin(Purchase, (Purchase.id == Return.purchase_id) & (Purchase.status == 'returned')) \
+        .outerjoin(Game, Game.id == Purchase.game_id)
+
+
+EXPORTS = {'orders': _orders, 'returns': _returns}
+
+
+def _value(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def _lines(result, fmt):
+    columns = list(result.keys())
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in result.partitions():
+            writer.writerows([_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for rows in result.partitions():
+            yield ''.join(json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False) + '\n'
+                          for row in rows)
+
+
+# Exports walk the table in id order from a streaming cursor, EXPORT_YIELD_PER rows at a time, and hand every
+# batch to the client as soon as it is formatted, so memory stays flat however long the history is. An export
+# that breaks off is resumed with ?after_id= set to the last id received; ?from= and ?to= (YYYY-MM-DD,
+# inclusive) limit it to a date range.
+def _export(kind, fmt, customer_id=None):
+    table, statement = EXPORTS[kind]()
+    if customer_id is not None:
+        statement = statement.where(table.customer_id == customer_id)
+    start = request.args.get('from', type=datetime.date.fromisoformat)
+    end = request.args.get('to', type=datetime.date.fromisoformat)
+    after_id = request.args.get('after_id', type=int)
+    if start is not None:
+        statement = statement.where(table.date >= start)
+    if end is not None:
+        statement = statement.where(table.date < end + datetime.timedelta(days=1))
+    if after_id is not None:
+        statement = statement.where(table.id > after_id)
+    result = db.session.execute(statement.order_by(table.id).execution_options(
+        stream_results=True, yield_per=app.config['EXPORT_YIELD_PER']))
+    filename = f"{kind}-{'all' if customer_id is None else customer_id}.{fmt}"
+    return Response(stream_with_context(_lines(result, fmt)), mimetype=MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+@app.route("/account/export/<any(orders, returns):kind>.<any(csv, ndjson):fmt>")
+@login_required
+def export_history(kind, fmt):
+    return _export(kind, fmt, current_user.id)
+
+
+@app.route("/reports/export/<any(orders, returns):kind>.<any(csv, ndjson):fmt>")
+@admin_required
+def export_all_history(kind, fmt):
+    return _export(kind, fmt, request.args.get('customer', type=int))
@@ -0,0 +1,173 @@
+import bisect
+import threading
+import time
+from sqlalchemy import text
+from game_store import app, db
+from game_store.changes import current_version, changes_since
+
+
+app.config.setdefault('FACET_REFRESH_INTERVAL', 1.0)
+app.config.setdefault('FACET_REBUILD_THRESHOLD', 10000)
+
+FACETS = ('platform', 'genre', 'publisher', 'year')
+
+
+def _iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Every facet value owns a bitset over game ids, kept as a Python int: bit n is set when game n has that value.
+# Filtering is an AND of per-facet ORs and a facet count is a popcount, so a query over the whole catalog costs
+# a handful of big-int operations instead of SQL joins. The index follows the catalog_change log: changed games
+# are reloaded and their bits moved, and only a large backlog of changes triggers a full rebuild.
+class FacetIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked = 0.0
+        self.games = {}
+        self.bitsets = {}
+        self.prices = []
+        self.all = 0
+
+    def _load(self, game_ids=None):
+        games_sql = "SELECT id, genre, publisher_id, price, release_date FROM game"
+        runs_sql = "SELECT platform_id, game_id FROM run"
+        if game_ids is not None:
+            id_list = ','.join(str(int(game_id)) for game_id in game_ids)
+            games_sql += f" WHERE id IN ({id_list})"
+            runs_sql += f" WHERE game_id IN ({id_list})"
+        rows = {row.id: {'platform': set(), 'genre': row.genre, 'publisher': row.publisher_id,
+                         'price': float(row.price), 'year': int(str(row.release_date)[:4])}
+                for row in db.session.execute(text(games_sql))}
+        for run in db.session.execute(text(runs_sql)):
+            if run.game_id in rows:
+                rows[run.game_id]['platform'].add(run.platform_id)
+        return rows
+
+    def _values(self, game):
+        for facet in FACETS:
+            values = game[facet] if facet == 'platform' else (game[facet],)
+            for value in values:
+                yield facet, value
+        yield 'price', game['price']
+
+    def _set(self, game_id, game):
+        bit = 1 << game_id
+        for facet, value in self._values(game):
+            values = self.bitsets[facet]
+            if value not in values:
+                values[value] = 0
+                if facet == 'price':
+                    bisect.insort(self.prices, value)
+            values[value] |= bit
+        self.games[game_id] = game
+        self.all |= bit
+
+    def _clear(self, game_id):
+        game = self.games.pop(game_id, None)
+        if game is None:
+            return
+        bit = 1 << game_id
+        for facet, value in self._values(game):
+            values = self.bitsets[facet]
+            values[value] &= ~bit
+            if not values[value]:
+                del values[value]
+                if facet == 'price':
+                    self.prices.remove(value)
+        self.all &= ~bit
+
+    def rebuild(self):
+        version = current_version()
+        rows = self._load()
+        with self.lock:
+            self.games, self.prices, self.all = {}, [], 0
+            self.bitsets = {facet: {} for facet in FACETS + ('price',)}
+            for game_id, game in rows.items():
+                self._set(game_id, game)
+            self.version = version
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.version is None:
+            self.rebuild()
+            self.checked = now
+            return
+        if now - self.checked < app.config['FACET_REFRESH_INTERVAL']:
+            return
+        self.checked = now
+        threshold = app.config['FACET_REBUILD_THRESHOLD']
+        changes = changes_since(self.version, limit=threshold + 1)
+        if len(changes) > threshold:
+            self.rebuild()
+            return
+        game_ids = {change.row_id for change in changes if change.table_name in ('game', 'run')}
+        rows = self._load(game_ids) if game_ids else {}
+        with self.lock:
+            for game_id in game_ids:
+                self._clear(game_id)
+                if game_id in rows:
+                    self._set(game_id, rows[game_id])
+            if changes:
+                self.version = changes[-1].version
+
+    def _range_mask(self, facet, keys, low, high):
+        mask = 0
+        values = self.bitsets[facet]
+        start = 0 if low is None else bisect.bisect_left(keys, low)
+        end = len(keys) if high is None else bisect.bisect_right(keys, high)
+        for key in keys[start:end]:
+            mask |= values[key]
+        return mask
+
+    def _masks(self, filters):
+        masks = {}
+        for facet in ('platform', 'genre', 'publisher'):
+            selected = filters.get(facet)
+            if selected:
+                mask = 0
+                for value in selected:
+                    mask |= self.bitsets[facet].get(value, 0)
+                masks[facet] = mask
+        if filters.get('year_min') is not None or filters.get('year_max') is not None:
+            masks['year'] = self._range_mask('year', sorted(self.bitsets['year']),
+                                             filters.get('year_min'), filters.get('year_max'))
+        if filters.get('price_min') is not None or filters.get('price_max') is not None:
+            masks['price'] = self._range_mask('price', self.prices, filters.get('price_min'), filters.get('price_max'))
+        return masks
+
+    # filters: 'platform', 'genre', 'publisher' map to lists of accepted values (OR within a facet);
+    # 'price_min', 'price_max', 'year_min', 'year_max' are inclusive bounds. Facet counts follow the usual
+    # disjunctive rule: a facet's counts apply every filter except the facet's own.
+    def query(self, filters, after=None, per_page=20):
+        self.refresh()
+        with self.lock:
+            masks = self._masks(filters)
+            matched = self.all
+            for mask in masks.values():
+                matched &= mask
+            counts = {}
+            for facet in FACETS:
+                base = self.all
+                for other, mask in masks.items():
+                    if other != facet:
+                        base &= mask
+                counts[facet] = {value: (base & bits).bit_count() for value, bits in self.bitsets[facet].items()}
+        total = matched.bit_count()
+        # Game ids are positive, so a negative cursor (a hand-edited URL) just means the first page.
+        if after is not None and after >= 0:
+            matched = matched >> (after + 1) << (after + 1)
+        ids = []
+        for game_id in _iter_bits(matched):
+            ids.append(game_id)
+            if len(ids) > per_page:
+                break
+        next_after = ids[per_page - 1] if len(ids) > per_page else None
+        return ids[:per_page], next_after, total, counts
+
+
+facet_index = FacetIndex()
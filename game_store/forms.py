@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, BooleanField, IntegerField
-from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError
+from wtforms import StringField, PasswordField, SubmitField, BooleanField, IntegerField, HiddenField
+from wtforms.validators import DataRequired, Length, Email, EqualTo, NumberRange
+from sqlalchemy import or_
 from game_store.models import Customer
 
 class RegistrationForm(FlaskForm):
@@ -13,15 +14,22 @@ class RegistrationForm(FlaskForm):
                                      validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Войти')
 
-    def validate_username(self, username):
-        user = Customer.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('That username is taken. Please choose a different one.')
+    def validate(self):
+        valid = super().validate()
+        return self.check_unique() and valid
 
-    def validate_email(self, email):
-        user = Customer.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('That email is taken. Please choose a different one.')
+    # Username and email are checked in one query; the UNIQUE constraints catch a registration racing this one,
+    # and the view calls this again to report which value was taken.
+    def check_unique(self):
+        taken = Customer.query.with_entities(Customer.username, Customer.email) \
+            .filter(or_(Customer.username == self.username.data, Customer.email == self.email.data)).limit(2).all()
+        for username, email in taken:
+            if username == self.username.data:
+                self.username.errors = list(self.username.errors) + [
+                    'That username is taken. Please choose a different one.']
+            if email == self.email.data:
+                self.email.errors = list(self.email.errors) + ['That email is taken. Please choose a different one.']
+        return not taken
 
 
 class LoginForm(FlaskForm):
@@ -33,8 +41,14 @@ class LoginForm(FlaskForm):
 
 
 class BuyForm(FlaskForm):
-    quantity = IntegerField('Количество', validators=[DataRequired()])
+    quantity = IntegerField('Количество', validators=[DataRequired(), NumberRange(min=1)])
+    idempotency_key = HiddenField()
     submit = SubmitField('Купить')
+    add_to_cart = SubmitField('В корзину')
+
+class CheckoutForm(FlaskForm):
+    idempotency_key = HiddenField()
+    submit = SubmitField('Оформить заказ')
 
 class ReturnForm(FlaskForm):
     submit = SubmitField('Отменить')
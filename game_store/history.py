@@ -0,0 +1,36 @@
+from sqlalchemy import literal_column
+from game_store import app, db
+from game_store.models import Purchase, Return, Game
+
+
+app.config.setdefault('HISTORY_PER_PAGE', 20)
+
+# SQLite only uses a partial index when the query repeats its WHERE term literally, not as a bound parameter.
+ACTIVE = literal_column("'active'")
+
+
+# Both queries walk a per-customer index newest first, ix_purchase_customer_id_active (active purchases only)
+# and ix_return_customer_id, so a page costs per_page index lookups regardless of how many orders the store has
+# in total.
+def _page(query, id_column, before, per_page):
+    per_page = per_page or app.config['HISTORY_PER_PAGE']
+    if before is not None:
+        query = query.filter(id_column < before)
+    rows = query.order_by(id_column.desc()).limit(per_page + 1).all()
+    next_before = rows[per_page - 1].id if len(rows) > per_page else None
+    return rows[:per_page], next_before
+
+
+def order_history(customer_id, before=None, per_page=None):
+    query = db.session.query(Purchase.id, Purchase.date, Purchase.qty, Game.game_name) \
+        .join(Game, Game.id == Purchase.game_id) \
+        .filter(Purchase.customer_id == customer_id, Purchase.status == ACTIVE)
+    return _page(query, Purchase.id, before, per_page)
+
+
+def return_history(customer_id, before=None, per_page=None):
+    query = db.session.query(Return.id, Return.date, Return.purchase_id, Game.game_name) \
+        .outerjoin(Purchase, (Purchase.id == Return.purchase_id) & (Purchase.status == 'returned')) \
+        .outerjoin(Game, Game.id == Purchase.game_id) \
+        .filter(Return.customer_id == customer_id)
+    return _page(query, Return.id, before, per_page)
@@ -0,0 +1,134 @@
+import csv
+import datetime
+import decimal
+import itertools
+import json
+import time
+from sqlalchemy import Date, Integer, Numeric
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from game_store import db
+from game_store.models import Game, Publisher, Platform, Run, ImportProgress
+
+
+# Within a chunk rows are written parents first, so a chunk may carry a game together with its publisher.
+MODELS = {'publisher': Publisher, 'platform': Platform, 'game': Game, 'run': Run}
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+# Yields (line number, record). A line that is not valid JSON is yielded as an InvalidRow in place of its record,
+# so it is rejected like any other bad record and still counts towards the checkpoint position.
+def read_records(path, fmt):
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except json.JSONDecodeError as error:
+                        yield number, InvalidRow(f'bad JSON: {error.msg} at column {error.colno}')
+
+
+def _convert(column, value):
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Date):
+        return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(value)
+    if isinstance(column.type, Numeric):
+        return decimal.Decimal(str(value))
+    return str(value)
+
+
+def validate(record, default_kind):
+    if isinstance(record, InvalidRow):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRow(f'expected an object, got {type(record).__name__}')
+    kind = record.get('kind') or default_kind
+    if kind not in MODELS:
+        raise InvalidRow(f'unknown kind {kind!r}')
+    row = {}
+    for column in MODELS[kind].__table__.columns:
+        value = record.get(column.name)
+        if value is None or value == '':
+            if column.primary_key or not column.nullable:
+                raise InvalidRow(f'{kind}: missing {column.name}')
+            row[column.name] = None
+            continue
+        try:
+            row[column.name] = _convert(column, value)
+        except (ValueError, TypeError, decimal.InvalidOperation):
+            raise InvalidRow(f'{kind}: bad {column.name} {value!r}')
+    return kind, row
+
+
+def _upsert_statement(model):
+    table = model.__table__
+    statement = sqlite_insert(table)
+    keys = [column.name for column in table.primary_key]
+    values = {column.name: statement.excluded[column.name] for column in table.columns if not column.primary_key}
+    if not values:
+        return statement.on_conflict_do_nothing(index_elements=keys)
+    return statement.on_conflict_do_update(index_elements=keys, set_=values)
+
+
+def _write_chunk(chunk, source, position):
+    by_kind = {kind: [] for kind in MODELS}
+    for kind, row in chunk:
+        by_kind[kind].append(row)
+    for kind, rows in by_kind.items():
+        if rows:
+            db.session.execute(_upsert_statement(MODELS[kind]), rows)
+    db.session.merge(ImportProgress(source=source, position=position))
+    db.session.commit()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Records are streamed from disk, validated one by one and upserted in chunks of chunk_size with executemany.
+# The position of the last committed record is stored in import_progress in the same transaction as the chunk,
+# so a failed import resumes after the last chunk that reached the database.
+def import_catalog(path, fmt, default_kind=None, chunk_size=1000, source=None, restart=False, report=None):
+    source = source or path
+    ImportProgress.__table__.create(db.engine, checkfirst=True)
+    progress = None if restart else db.session.get(ImportProgress, source)
+    start = progress.position if progress else 0
+    stats = {'resumed_from': start, 'imported': 0, 'rejected': 0, 'errors': []}
+    started = time.perf_counter()
+
+    records = itertools.islice(read_records(path, fmt), start, None)
+    position = start
+    for chunk in _chunks(records, chunk_size):
+        rows = []
+        for line, record in chunk:
+            try:
+                rows.append(validate(record, default_kind))
+            except InvalidRow as error:
+                stats['rejected'] += 1
+                if len(stats['errors']) < 20:
+                    stats['errors'].append(f'line {line}: {error}')
+        position += len(chunk)
+        _write_chunk(rows, source, position)
+        stats['imported'] += len(rows)
+        if report:
+            elapsed = time.perf_counter() - started
+            report(position, stats['imported'] / elapsed if elapsed else 0.0)
+
+    ImportProgress.query.filter_by(source=source).delete()
+    db.session.commit()
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = stats['imported'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
@@ -0,0 +1,186 @@
+import datetime
+import json
+import random
+import threading
+import uuid
+from sqlalchemy import bindparam, text, DateTime
+from sqlalchemy.exc import OperationalError
+from game_store import app, db
+from game_store.models import Job
+
+
+app.config.setdefault('JOB_WORKER_THREADS', 4)
+app.config.setdefault('JOB_LEASE_SECONDS', 300)
+app.config.setdefault('JOB_MAX_ATTEMPTS', 5)
+app.config.setdefault('JOB_RETRY_BACKOFF', 10)
+app.config.setdefault('JOB_RETRY_MAX_DELAY', 3600)
+app.config.setdefault('JOB_POLL_INTERVAL', 1.0)
+
+# A job is a row in the job table. enqueue() only inserts it into the caller's session, so the job commits or
+# rolls back together with the purchase, return or registration that produced it, and the request is done as
+# soon as that commit is. Workers claim one queued job at a time with a single UPDATE ... RETURNING under
+# SQLite's write lock: the claim moves run_at to the end of a lease and stamps a fresh lease_token, so a job
+# whose worker died becomes claimable again once the lease runs out. Completing deletes the row and failing
+# reschedules it with exponential backoff, both only while the worker still holds the lease; after
+# JOB_MAX_ATTEMPTS the job stays behind with status 'failed'. Delivery is at least once, so handlers must
+# tolerate running twice; database writes a handler makes commit together with the job's deletion.
+CLAIM_SQL = text("""UPDATE job SET run_at = :lease_until, lease_token = :token, attempts = attempts + 1
+    WHERE id = (SELECT id FROM job WHERE status = 'queued' AND run_at <= :now ORDER BY run_at, id LIMIT 1)
+    RETURNING id, kind, payload, attempts""").bindparams(bindparam('now', type_=DateTime),
+                                                          bindparam('lease_until', type_=DateTime))
+COMPLETE_SQL = text('DELETE FROM job WHERE id = :id AND lease_token = :token')
+FAIL_SQL = text("""UPDATE job SET status = :status, run_at = :run_at, lease_token = NULL, last_error = :error
+    WHERE id = :id AND lease_token = :token""").bindparams(bindparam('run_at', type_=DateTime))
+
+# Queues a periodic job unless one of its kind is already queued; the check and the insert are one statement,
+# so worker processes starting together queue it once.
+SCHEDULE_SQL = text("""INSERT INTO job (kind, payload, run_at, created)
+    SELECT :kind, '{}', :run_at, :now
+    WHERE NOT EXISTS (SELECT 1 FROM job WHERE kind = :kind AND status = 'queued')""").bindparams(
+    bindparam('run_at', type_=DateTime), bindparam('now', type_=DateTime))
+
+handlers = {}
+periodic = {}
+
+
+def job_handler(kind):
+    def register(function):
+        handlers[kind] = function
+        return function
+    return register
+
+
+# A periodic job queues its next run, interval seconds (a config setting) later, when it completes or gives up.
+# Worker.run() queues the first run.
+def periodic_job(kind, interval):
+    def register(function):
+        handlers[kind] = function
+        periodic[kind] = interval
+        return function
+    return register
+
+
+def enqueue(kind, payload, delay=0):
+    now = datetime.datetime.now()
+    db.session.execute(Job.__table__.insert(), {
+        'kind': kind, 'payload': json.dumps(payload), 'run_at': now + datetime.timedelta(seconds=delay),
+        'created': now})
+
+
+def schedule(kind, delay=0):
+    now = datetime.datetime.now()
+    db.session.execute(SCHEDULE_SQL, {'kind': kind, 'run_at': now + datetime.timedelta(seconds=delay), 'now': now})
+
+
+def _schedule_next(job):
+    if job.kind in periodic:
+        schedule(job.kind, app.config[periodic[job.kind]])
+
+
+def claim():
+    now = datetime.datetime.now()
+    token = uuid.uuid4().hex
+    job = db.session.execute(CLAIM_SQL, {
+        'now': now, 'token': token,
+        'lease_until': now + datetime.timedelta(seconds=app.config['JOB_LEASE_SECONDS'])}).first()
+    db.session.commit()
+    return None if job is None else (job, token)
+
+
+def retry_delay(attempts):
+    delay = min(app.config['JOB_RETRY_BACKOFF'] * 2 ** (attempts - 1), app.config['JOB_RETRY_MAX_DELAY'])
+    return delay * random.uniform(0.5, 1)
+
+
+def _fail(job, token, error):
+    dead = job.attempts >= app.config['JOB_MAX_ATTEMPTS']
+    db.session.execute(FAIL_SQL, {
+        'id': job.id, 'token': token, 'status': 'failed' if dead else 'queued', 'error': error[:500],
+        'run_at': datetime.datetime.now() + datetime.timedelta(seconds=retry_delay(job.attempts))})
+    if dead:
+        _schedule_next(job)
+    db.session.commit()
+
+
+# Claims and runs one job. Returns None when nothing was due, otherwise whether the job succeeded.
+def run_one():
+    claimed = claim()
+    if claimed is None:
+        return None
+    job, token = claimed
+    try:
+        handler = handlers.get(job.kind)
+        if handler is None:
+            raise LookupError(f'no handler for job kind {job.kind!r}')
+        handler(json.loads(job.payload))
+    except Exception as error:
+        db.session.rollback()
+        app.logger.exception('job %s (%s) failed on attempt %s', job.id, job.kind, job.attempts)
+        _fail(job, token, f'{type(error).__name__}: {error}')
+        return False
+    if db.session.execute(COMPLETE_SQL, {'id': job.id, 'token': token}).rowcount != 1:
+        # The lease ran out and another worker has the job now; its run is the one that counts.
+        db.session.rollback()
+        return False
+    _schedule_next(job)
+    db.session.commit()
+    return True
+
+
+class Worker:
+    def __init__(self, threads=None):
+        self.threads = threads or app.config['JOB_WORKER_THREADS']
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.succeeded = self.failed = 0
+
+    def _loop(self, drain):
+        with app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    result = run_one()
+                except OperationalError:
+                    db.session.rollback()
+                    app.logger.exception('job queue unavailable')
+                    result = None
+                finally:
+                    db.session.remove()
+                if result is None:
+                    if drain:
+                        return
+                    self.stopping.wait(app.config['JOB_POLL_INTERVAL'])
+                    continue
+                with self.lock:
+                    if result:
+                        self.succeeded += 1
+                    else:
+                        self.failed += 1
+
+    # With drain=True every thread returns once no job is due; otherwise the worker polls until stop().
+    def run(self, drain=False):
+        with app.app_context():
+            for kind in periodic:
+                schedule(kind)
+            db.session.commit()
+            db.session.remove()
+        threads = [threading.Thread(target=self._loop, args=(drain,), name=f'job-worker-{n}', daemon=True)
+                   for n in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        return {'succeeded': self.succeeded, 'failed': self.failed}
+
+    def stop(self):
+        self.stopping.set()
+
+
+def queue_stats():
+    counts = dict(db.session.execute(text('SELECT status, count(*) FROM job GROUP BY status')).all())
+    return {status: counts.get(status, 0) for status in ('queued', 'failed')}
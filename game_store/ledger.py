@@ -0,0 +1,88 @@
+import datetime
+import decimal
+from sqlalchemy import text
+from game_store import app, db
+from game_store.jobs import periodic_job
+from game_store.models import LedgerEntry
+
+
+app.config.setdefault('LEDGER_COMPACT_INTERVAL', 600)
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+# Money moves are appended to ledger_entry and never updated, so concurrent buyers no longer queue on one
+# customer row and every balance can be traced back entry by entry. Amounts are integer cents: a balance is
+# a SUM over many rows, and summing SQLite REALs would drift. A customer's balance is their balance_snapshot
+# plus the entries after snapshot.entry_id, read through the covering ix_ledger_entry_customer_id_id index;
+# compact() moves the snapshots forward so that tail stays short. customer.balance keeps the opening balance
+# the account was created with and is not written after that.
+BALANCE_SQL = """coalesce((SELECT cents FROM balance_snapshot WHERE customer_id = :customer_id), 0)
+    + coalesce((SELECT sum(cents) FROM ledger_entry WHERE customer_id = :customer_id AND id > coalesce(
+        (SELECT entry_id FROM balance_snapshot WHERE customer_id = :customer_id), 0)), 0)"""
+
+
+def to_cents(amount):
+    return int((decimal.Decimal(str(amount)) * 100).to_integral_value(rounding=decimal.ROUND_HALF_UP))
+
+
+def balance(customer_id):
+    cents = db.session.execute(text('SELECT ' + BALANCE_SQL), {'customer_id': customer_id}).scalar()
+    return decimal.Decimal(cents).scaleb(-2)
+
+
+# The direction of a money move is the function, never the sign of the amount: a negative debit would be a
+# credit that skips the balance check.
+def _positive_cents(amount):
+    cents = to_cents(amount)
+    if cents <= 0:
+        raise ValueError(f'amount must be positive, got {amount}')
+    return cents
+
+
+def credit(customer_id, amount, kind, reference=None):
+    db.session.execute(LedgerEntry.__table__.insert(), {
+        'customer_id': customer_id, 'cents': _positive_cents(amount), 'kind': kind, 'reference': reference,
+        'date': datetime.datetime.now()})
+
+
+def debit(customer_id, amount, kind, reference=None):
+    # The balance check is the WHERE of the insert itself, evaluated under SQLite's write lock, so two
+    # concurrent buyers can never both spend the same balance.
+    cents = _positive_cents(amount)
+    result = db.session.execute(text(
+        'INSERT INTO ledger_entry (customer_id, cents, kind, reference, date) '
+        'SELECT :customer_id, -:cents, :kind, :reference, :date WHERE ' + BALANCE_SQL + ' >= :cents'), {
+        'customer_id': customer_id, 'cents': cents, 'kind': kind, 'reference': reference,
+        'date': datetime.datetime.now()})
+    if result.rowcount != 1:
+        raise InsufficientFunds()
+
+
+# Snapshots every customer with entries since the last compaction at the current end of the ledger. Every
+# snapshot it writes carries the same entry_id, so max(balance_snapshot.entry_id) is where the next run starts.
+def compact():
+    high = db.session.execute(text('SELECT max(id) FROM ledger_entry')).scalar() or 0
+    since = db.session.execute(text('SELECT max(entry_id) FROM balance_snapshot')).scalar() or 0
+    if high <= since:
+        return 0
+    result = db.session.execute(text("""
+        INSERT INTO balance_snapshot (customer_id, cents, entry_id, date)
+        SELECT active.customer_id, coalesce(snapshot.cents, 0) + (
+                   SELECT sum(cents) FROM ledger_entry WHERE customer_id = active.customer_id
+                   AND id > coalesce(snapshot.entry_id, 0) AND id <= :high),
+               :high, :date
+        FROM (SELECT DISTINCT customer_id FROM ledger_entry WHERE id > :since AND id <= :high) AS active
+        LEFT JOIN balance_snapshot AS snapshot ON snapshot.customer_id = active.customer_id
+        WHERE true
+        ON CONFLICT (customer_id) DO UPDATE SET cents = excluded.cents, entry_id = excluded.entry_id,
+            date = excluded.date"""), {'since': since, 'high': high, 'date': datetime.datetime.now()})
+    db.session.commit()
+    return result.rowcount
+
+
+@periodic_job('compact_ledger', 'LEDGER_COMPACT_INTERVAL')
+def compact_job(payload):
+    compact()
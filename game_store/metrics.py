@@ -0,0 +1,196 @@
+import bisect
+import functools
+import random
+import threading
+import time
+from collections import Counter
+import jinja2
+from flask import g, has_request_context, request, abort, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from game_store import app
+from game_store.cache import catalog_cache
+from game_store.pagecache import page_cache
+from game_store.jobs import queue_stats
+
+
+app.config.setdefault('METRICS_SAMPLE_RATE', 0.1)
+app.config.setdefault('METRICS_N_PLUS_ONE_THRESHOLD', 5)
+app.config.setdefault('METRICS_SLOW_STATEMENTS', 5)
+app.config.setdefault('METRICS_ALLOW_REMOTE', False)
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Request latency is recorded for every request. SQL and template accounting only runs for the
+# METRICS_SAMPLE_RATE share of requests, which keeps the per-statement hooks off the hot path of the rest.
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.n_plus_one = Counter()
+        self.slowest = {}
+
+    def observe(self, name, endpoint, value, buckets=SECONDS_BUCKETS):
+        with self.lock:
+            key = (name, endpoint)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def record_request(self, endpoint, state):
+        self.observe('sql_queries_per_request', endpoint, state['queries'], QUERY_BUCKETS)
+        self.observe('sql_seconds_per_request', endpoint, state['sql_seconds'])
+        self.observe('template_seconds', endpoint, state['template_seconds'])
+        repeated = [statement for statement, count in state['statements'].items()
+                    if count >= app.config['METRICS_N_PLUS_ONE_THRESHOLD']]
+        with self.lock:
+            if repeated:
+                self.n_plus_one[endpoint] += 1
+            slowest = self.slowest.setdefault(endpoint, {})
+            for seconds, statement in state['slowest']:
+                slowest[statement] = max(seconds, slowest.get(statement, 0.0))
+            limit = app.config['METRICS_SLOW_STATEMENTS']
+            if len(slowest) > limit:
+                self.slowest[endpoint] = dict(sorted(slowest.items(), key=lambda item: -item[1])[:limit])
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f'# TYPE game_store_{name} histogram')
+                for (metric, endpoint), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'game_store_{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                    lines.append(f'game_store_{name}_sum{{endpoint="{endpoint}"}} {histogram.sum}')
+                    lines.append(f'game_store_{name}_count{{endpoint="{endpoint}"}} {histogram.count}')
+            lines.append('# TYPE game_store_n_plus_one_requests_total counter')
+            for endpoint, count in sorted(self.n_plus_one.items()):
+                lines.append(f'game_store_n_plus_one_requests_total{{endpoint="{endpoint}"}} {count}')
+            lines.append('# TYPE game_store_slow_statement_seconds gauge')
+            for endpoint, statements in sorted(self.slowest.items()):
+                for statement, seconds in sorted(statements.items(), key=lambda item: -item[1]):
+                    lines.append(f'game_store_slow_statement_seconds{{endpoint="{endpoint}",'
+                                 f'statement="{_label(statement)}"}} {seconds}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    value = ' '.join(value.split())[:200]
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+metrics = Metrics()
+
+
+def _state():
+    if has_request_context():
+        return g.get('_metrics')
+    return None
+
+
+@app.before_request
+def start_request_metrics():
+    g._request_started = time.perf_counter()
+    if random.random() < app.config['METRICS_SAMPLE_RATE']:
+        g._metrics = {'queries': 0, 'sql_seconds': 0.0, 'template_seconds': 0.0,
+                      'statements': Counter(), 'slowest': []}
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('_request_started')
+    endpoint = request.endpoint or 'unknown'
+    if started is not None and endpoint != 'metrics_endpoint':
+        metrics.observe('request_seconds', endpoint, time.perf_counter() - started)
+        state = _state()
+        if state is not None:
+            metrics.record_request(endpoint, state)
+    return response
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _state() is not None:
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = _state()
+    started = conn.info.get('_metrics_started')
+    if state is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    state['queries'] += 1
+    state['sql_seconds'] += elapsed
+    state['statements'][statement] += 1
+    state['slowest'].append((elapsed, statement))
+    state['slowest'] = sorted(state['slowest'], key=lambda item: -item[0])[:app.config['METRICS_SLOW_STATEMENTS']]
+
+
+class TimedTemplate(jinja2.Template):
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            state = _state()
+            if state is not None:
+                state['template_seconds'] += time.perf_counter() - started
+
+
+app.jinja_env.template_class = TimedTemplate
+
+
+# Operational endpoints answer only requests from this machine unless METRICS_ALLOW_REMOTE is set; anyone else
+# gets a 404, as if they did not exist.
+def local_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not app.config['METRICS_ALLOW_REMOTE'] and request.remote_addr not in ('127.0.0.1', '::1'):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/metrics')
+@local_only
+def metrics_endpoint():
+    """Prometheus text format. Histograms, counters and cache figures belong to the worker process that answers
+    the scrape: under `game_store.server --workers N` every scrape sees one of N independent sets, and counters
+    appear to reset when consecutive scrapes land on different workers. Only the job queue gauges come from the
+    database and cover the whole deployment."""
+    lines = ['# TYPE game_store_catalog_cache gauge']
+    for name, value in catalog_cache.stats().items():
+        if value is not None:
+            lines.append(f'game_store_catalog_cache{{stat="{name}"}} {value}')
+    lines.append('# TYPE game_store_page_cache_requests_total counter')
+    for name, value in page_cache.stats().items():
+        lines.append(f'game_store_page_cache_requests_total{{result="{name}"}} {value}')
+    from game_store.passwords import password_hasher
+    lines.append('# TYPE game_store_password_hashes_total counter')
+    for name, value in password_hasher.stats().items():
+        lines.append(f'game_store_password_hashes_total{{result="{name}"}} {value}')
+    lines.append('# TYPE game_store_jobs gauge')
+    for name, value in queue_stats().items():
+        lines.append(f'game_store_jobs{{status="{name}"}} {value}')
+    return Response(metrics.render() + '\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
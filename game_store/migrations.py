@@ -0,0 +1,435 @@
+from sqlalchemy import text
+
+
+# The schema version is kept in PRAGMA user_version. Every migration is idempotent (IF NOT EXISTS, column
+# checks), so a database that was patched by hand before this module existed, like the shipped site.db,
+# is simply brought up to date and stamped, and a migration interrupted halfway can be run again.
+# Every migration carries its own copy of the SQL it ran when it shipped, never the models or the live DDL of
+# other modules, so later changes to those cannot change what an old migration does on a fresh database.
+BASELINE = [
+    """CREATE TABLE IF NOT EXISTS customer (
+        id INTEGER NOT NULL,
+        username VARCHAR(20) NOT NULL,
+        email VARCHAR(120) NOT NULL,
+        password VARCHAR(60) NOT NULL,
+        balance NUMERIC(4, 2),
+        PRIMARY KEY (id),
+        CONSTRAINT check_bar_positive CHECK (balance >= 0),
+        UNIQUE (username),
+        UNIQUE (email))""",
+    """CREATE TABLE IF NOT EXISTS publisher (
+        id INTEGER NOT NULL,
+        publisher_name VARCHAR(20) NOT NULL,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE IF NOT EXISTS platform (
+        id INTEGER NOT NULL,
+        platform_name VARCHAR(50) NOT NULL,
+        release_date DATE NOT NULL,
+        price NUMERIC(4, 2) NOT NULL,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE IF NOT EXISTS game (
+        id INTEGER NOT NULL,
+        game_name VARCHAR(50) NOT NULL,
+        genre VARCHAR(50) NOT NULL,
+        release_date DATE NOT NULL,
+        price NUMERIC(4, 2) NOT NULL,
+        description VARCHAR(200) NOT NULL,
+        publisher_id INTEGER,
+        poster VARCHAR(100) NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(publisher_id) REFERENCES publisher (id))""",
+    """CREATE TABLE IF NOT EXISTS run (
+        platform_id INTEGER NOT NULL,
+        game_id INTEGER NOT NULL,
+        PRIMARY KEY (platform_id, game_id),
+        FOREIGN KEY(platform_id) REFERENCES platform (id),
+        FOREIGN KEY(game_id) REFERENCES game (id))""",
+    """CREATE TABLE IF NOT EXISTS purchase (
+        id INTEGER NOT NULL,
+        customer_id INTEGER,
+        date DATETIME NOT NULL,
+        game_id INTEGER,
+        qty INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(customer_id) REFERENCES customer (id),
+        FOREIGN KEY(game_id) REFERENCES game (id))""",
+    """CREATE TABLE IF NOT EXISTS "return" (
+        id INTEGER NOT NULL,
+        customer_id INTEGER NOT NULL,
+        date DATETIME NOT NULL,
+        purchase_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(customer_id) REFERENCES customer (id),
+        FOREIGN KEY(purchase_id) REFERENCES purchase (id))""",
+    """CREATE TRIGGER IF NOT EXISTS delete_purchase AFTER INSERT ON "return" FOR EACH ROW
+    BEGIN
+        DELETE FROM purchase WHERE new.purchase_id == purchase.id;
+    END""",
+    """CREATE VIEW IF NOT EXISTS order_list AS
+        SELECT purchase.id, purchase.customer_id, purchase.date, game.game_name, qty
+        FROM purchase NATURAL JOIN game""",
+]
+
+
+def _execute(*statements):
+    def migrate(connection):
+        for statement in statements:
+            connection.execute(text(statement))
+    return migrate
+
+
+def _add_column(table, column, ddl):
+    def migrate(connection):
+        columns = {row[1] for row in connection.execute(text(f'PRAGMA table_info("{table}")'))}
+        if column not in columns:
+            connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column} {ddl}'))
+    return migrate
+
+
+def _steps(*migrations):
+    def migrate(connection):
+        for step in migrations:
+            step(connection)
+    return migrate
+
+
+GAME_SEARCH = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS game_fts USING fts5(
+        game_name, description, content='game', content_rowid='id',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS game_fts_ai AFTER INSERT ON game BEGIN
+        INSERT INTO game_fts(rowid, game_name, description) VALUES (new.id, new.game_name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_fts_ad AFTER DELETE ON game BEGIN
+        INSERT INTO game_fts(game_fts, rowid, game_name, description)
+        VALUES ('delete', old.id, old.game_name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_fts_au AFTER UPDATE OF game_name, description ON game BEGIN
+        INSERT INTO game_fts(game_fts, rowid, game_name, description)
+        VALUES ('delete', old.id, old.game_name, old.description);
+        INSERT INTO game_fts(rowid, game_name, description) VALUES (new.id, new.game_name, new.description);
+    END""",
+    "INSERT INTO game_fts(game_fts) VALUES ('rebuild')",
+]
+
+
+# Every write to a catalog table appends a row to catalog_change. For run rows row_id is the game and ref_id
+# the platform.
+CATALOG_CHANGE_LOG = [
+    """CREATE TABLE IF NOT EXISTS catalog_change (
+        version INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        table_name VARCHAR(20) NOT NULL,
+        row_id INTEGER NOT NULL,
+        ref_id INTEGER,
+        op VARCHAR(6) NOT NULL)""",
+    """CREATE TRIGGER IF NOT EXISTS game_change_insert AFTER INSERT ON game BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('game', new.id, NULL, 'insert');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_change_update AFTER UPDATE ON game BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('game', new.id, NULL, 'update');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_change_delete AFTER DELETE ON game BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('game', old.id, NULL, 'delete');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS publisher_change_insert AFTER INSERT ON publisher BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('publisher', new.id, NULL, 'insert');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS publisher_change_update AFTER UPDATE ON publisher BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('publisher', new.id, NULL, 'update');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS publisher_change_delete AFTER DELETE ON publisher BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('publisher', old.id, NULL, 'delete');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS platform_change_insert AFTER INSERT ON platform BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('platform', new.id, NULL, 'insert');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS platform_change_update AFTER UPDATE ON platform BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('platform', new.id, NULL, 'update');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS platform_change_delete AFTER DELETE ON platform BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('platform', old.id, NULL, 'delete');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS run_change_insert AFTER INSERT ON run BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('run', new.game_id, new.platform_id, 'insert');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS run_change_update AFTER UPDATE ON run BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('run', new.game_id, new.platform_id, 'update');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS run_change_delete AFTER DELETE ON run BEGIN
+        INSERT INTO catalog_change (table_name, row_id, ref_id, op)
+        VALUES ('run', old.game_id, old.platform_id, 'delete');
+    END""",
+]
+
+
+BALANCE_LEDGER = [
+    """CREATE TABLE IF NOT EXISTS ledger_entry (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER NOT NULL,
+        cents INTEGER NOT NULL,
+        kind VARCHAR(10) NOT NULL,
+        reference VARCHAR(64),
+        date DATETIME NOT NULL,
+        FOREIGN KEY(customer_id) REFERENCES customer (id))""",
+    'CREATE INDEX IF NOT EXISTS ix_ledger_entry_customer_id_id ON ledger_entry (customer_id, id, cents)',
+    """CREATE TABLE IF NOT EXISTS balance_snapshot (
+        customer_id INTEGER NOT NULL,
+        cents INTEGER NOT NULL,
+        entry_id INTEGER NOT NULL,
+        date DATETIME NOT NULL,
+        PRIMARY KEY (customer_id),
+        FOREIGN KEY(customer_id) REFERENCES customer (id))""",
+    'CREATE INDEX IF NOT EXISTS ix_balance_snapshot_entry_id ON balance_snapshot (entry_id)',
+    # Every existing balance becomes the customer's opening entry.
+    """INSERT INTO ledger_entry (customer_id, cents, kind, date)
+        SELECT id, CAST(round(coalesce(balance, 0) * 100) AS INTEGER), 'opening', datetime('now', 'localtime')
+        FROM customer
+        WHERE NOT EXISTS (SELECT 1 FROM ledger_entry WHERE ledger_entry.customer_id = customer.id)""",
+]
+
+
+# The sales summaries as migration 11 shipped them, valued at game.price: migration 16 replaces the triggers
+# once purchase.unit_price exists, so this copy must not follow later changes to reports.py.
+SALES_SUMMARIES = [
+    """CREATE TABLE IF NOT EXISTS sales_game_day (
+        day DATE NOT NULL,
+        game_id INTEGER NOT NULL,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue_cents INTEGER NOT NULL DEFAULT 0,
+        returned_units INTEGER NOT NULL DEFAULT 0,
+        refunded_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, game_id)) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS sales_day (
+        day DATE NOT NULL PRIMARY KEY,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue_cents INTEGER NOT NULL DEFAULT 0,
+        returned_units INTEGER NOT NULL DEFAULT 0,
+        refunded_cents INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID""",
+    """CREATE TRIGGER IF NOT EXISTS sales_purchase_ai AFTER INSERT ON purchase BEGIN
+        INSERT INTO sales_game_day (day, game_id, units, revenue_cents)
+        SELECT date(new.date), new.game_id, new.qty, CAST(round(game.price * 100 * new.qty) AS INTEGER)
+        FROM game WHERE game.id = new.game_id
+        ON CONFLICT (day, game_id) DO UPDATE SET units = units + excluded.units,
+            revenue_cents = revenue_cents + excluded.revenue_cents;
+        INSERT INTO sales_day (day, units, revenue_cents)
+        SELECT date(new.date), new.qty, CAST(round(game.price * 100 * new.qty) AS INTEGER)
+        FROM game WHERE game.id = new.game_id
+        ON CONFLICT (day) DO UPDATE SET units = units + excluded.units,
+            revenue_cents = revenue_cents + excluded.revenue_cents;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sales_return_ai AFTER INSERT ON "return" BEGIN
+        INSERT INTO sales_game_day (day, game_id, returned_units, refunded_cents)
+        SELECT date(new.date), purchase.game_id, purchase.qty, CAST(round(game.price * 100 * purchase.qty) AS INTEGER)
+        FROM purchase JOIN game ON game.id = purchase.game_id
+        WHERE purchase.id = new.purchase_id AND purchase.status = 'returned'
+        ON CONFLICT (day, game_id) DO UPDATE SET returned_units = returned_units + excluded.returned_units,
+            refunded_cents = refunded_cents + excluded.refunded_cents;
+        INSERT INTO sales_day (day, returned_units, refunded_cents)
+        SELECT date(new.date), purchase.qty, CAST(round(game.price * 100 * purchase.qty) AS INTEGER)
+        FROM purchase JOIN game ON game.id = purchase.game_id
+        WHERE purchase.id = new.purchase_id AND purchase.status = 'returned'
+        ON CONFLICT (day) DO UPDATE SET returned_units = returned_units + excluded.returned_units,
+            refunded_cents = refunded_cents + excluded.refunded_cents;
+    END""",
+    'DELETE FROM sales_game_day',
+    'DELETE FROM sales_day',
+    """INSERT INTO sales_game_day (day, game_id, units, revenue_cents, returned_units, refunded_cents)
+        SELECT day, game_id, sum(units), sum(revenue_cents), sum(returned_units), sum(refunded_cents) FROM (
+            SELECT date(purchase.date) AS day, purchase.game_id AS game_id, purchase.qty AS units,
+                   CAST(round(game.price * 100 * purchase.qty) AS INTEGER) AS revenue_cents,
+                   0 AS returned_units, 0 AS refunded_cents
+            FROM purchase JOIN game ON game.id = purchase.game_id
+            UNION ALL
+            SELECT date("return".date), purchase.game_id, 0, 0, purchase.qty,
+                   CAST(round(game.price * 100 * purchase.qty) AS INTEGER)
+            FROM "return" JOIN purchase ON purchase.id = "return".purchase_id AND purchase.status = 'returned'
+            JOIN game ON game.id = purchase.game_id)
+        GROUP BY day, game_id""",
+    """INSERT INTO sales_day (day, units, revenue_cents, returned_units, refunded_cents)
+        SELECT day, sum(units), sum(revenue_cents), sum(returned_units), sum(refunded_cents)
+        FROM sales_game_day GROUP BY day""",
+]
+
+
+POSTER_CACHE = [
+    """CREATE TABLE IF NOT EXISTS poster_image (
+        source_url VARCHAR(255) NOT NULL,
+        digest VARCHAR(32),
+        extension VARCHAR(5),
+        error VARCHAR(200),
+        date DATETIME NOT NULL,
+        PRIMARY KEY (source_url))""",
+]
+
+
+JOB_QUEUE = [
+    """CREATE TABLE IF NOT EXISTS job (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        kind VARCHAR(40) NOT NULL,
+        payload TEXT NOT NULL,
+        status VARCHAR(8) DEFAULT 'queued' NOT NULL,
+        attempts INTEGER DEFAULT '0' NOT NULL,
+        run_at DATETIME NOT NULL,
+        lease_token VARCHAR(32),
+        last_error VARCHAR(500),
+        created DATETIME NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS ix_job_queued_run_at ON job (run_at, id) WHERE status = 'queued'",
+]
+
+
+# run.release_date follows game.release_date whichever side is written, and whatever a writer puts into it.
+GAME_RELEASE_DATE = '(SELECT release_date FROM game WHERE game.id = new.game_id)'
+RUN_RELEASE_DATE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS run_release_date_insert AFTER INSERT ON run
+    WHEN new.release_date IS NOT {GAME_RELEASE_DATE} BEGIN
+        UPDATE run SET release_date = {GAME_RELEASE_DATE}
+        WHERE platform_id = new.platform_id AND game_id = new.game_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS run_release_date_update AFTER UPDATE OF game_id, release_date ON run
+    WHEN new.release_date IS NOT {GAME_RELEASE_DATE} BEGIN
+        UPDATE run SET release_date = {GAME_RELEASE_DATE}
+        WHERE platform_id = new.platform_id AND game_id = new.game_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_run_release_date_insert AFTER INSERT ON game BEGIN
+        UPDATE run SET release_date = new.release_date WHERE game_id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_run_release_date_update AFTER UPDATE OF release_date ON game
+    WHEN new.release_date IS NOT old.release_date BEGIN
+        UPDATE run SET release_date = new.release_date WHERE game_id = new.id;
+    END""",
+]
+
+
+# Migration 16 values the sales summaries at purchase.unit_price, falling back to game.price for a purchase
+# written without one, and recomputes them from the purchases.
+PAID_PRICE_SALES = [
+    'DROP TRIGGER IF EXISTS sales_purchase_ai',
+    'DROP TRIGGER IF EXISTS sales_return_ai',
+    """CREATE TRIGGER IF NOT EXISTS sales_purchase_ai AFTER INSERT ON purchase BEGIN
+        INSERT INTO sales_game_day (day, game_id, units, revenue_cents)
+        SELECT date(new.date), new.game_id, new.qty,
+               CAST(round(coalesce(new.unit_price, game.price) * 100 * new.qty) AS INTEGER)
+        FROM game WHERE game.id = new.game_id
+        ON CONFLICT (day, game_id) DO UPDATE SET units = units + excluded.units,
+            revenue_cents = revenue_cents + excluded.revenue_cents;
+        INSERT INTO sales_day (day, units, revenue_cents)
+        SELECT date(new.date), new.qty, CAST(round(coalesce(new.unit_price, game.price) * 100 * new.qty) AS INTEGER)
+        FROM game WHERE game.id = new.game_id
+        ON CONFLICT (day) DO UPDATE SET units = units + excluded.units,
+            revenue_cents = revenue_cents + excluded.revenue_cents;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sales_return_ai AFTER INSERT ON "return" BEGIN
+        INSERT INTO sales_game_day (day, game_id, returned_units, refunded_cents)
+        SELECT date(new.date), purchase.game_id, purchase.qty,
+               CAST(round(coalesce(purchase.unit_price, game.price) * 100 * purchase.qty) AS INTEGER)
+        FROM purchase JOIN game ON game.id = purchase.game_id
+        WHERE purchase.id = new.purchase_id AND purchase.status = 'returned'
+        ON CONFLICT (day, game_id) DO UPDATE SET returned_units = returned_units + excluded.returned_units,
+            refunded_cents = refunded_cents + excluded.refunded_cents;
+        INSERT INTO sales_day (day, returned_units, refunded_cents)
+        SELECT date(new.date), purchase.qty,
+               CAST(round(coalesce(purchase.unit_price, game.price) * 100 * purchase.qty) AS INTEGER)
+        FROM purchase JOIN game ON game.id = purchase.game_id
+        WHERE purchase.id = new.purchase_id AND purchase.status = 'returned'
+        ON CONFLICT (day) DO UPDATE SET returned_units = returned_units + excluded.returned_units,
+            refunded_cents = refunded_cents + excluded.refunded_cents;
+    END""",
+    'DELETE FROM sales_game_day',
+    'DELETE FROM sales_day',
+    """INSERT INTO sales_game_day (day, game_id, units, revenue_cents, returned_units, refunded_cents)
+        SELECT day, game_id, sum(units), sum(revenue_cents), sum(returned_units), sum(refunded_cents) FROM (
+            SELECT date(purchase.date) AS day, purchase.game_id AS game_id, purchase.qty AS units,
+                   CAST(round(coalesce(purchase.unit_price, game.price) * 100 * purchase.qty) AS INTEGER)
+                       AS revenue_cents,
+                   0 AS returned_units, 0 AS refunded_cents
+            FROM purchase JOIN game ON game.id = purchase.game_id
+            UNION ALL
+            SELECT date("return".date), purchase.game_id, 0, 0, purchase.qty,
+                   CAST(round(coalesce(purchase.unit_price, game.price) * 100 * purchase.qty) AS INTEGER)
+            FROM "return" JOIN purchase ON purchase.id = "return".purchase_id AND purchase.status = 'returned'
+            JOIN game ON game.id = purchase.game_id)
+        GROUP BY day, game_id""",
+    """INSERT INTO sales_day (day, units, revenue_cents, returned_units, refunded_cents)
+        SELECT day, sum(units), sum(revenue_cents), sum(returned_units), sum(refunded_cents)
+        FROM sales_game_day GROUP BY day""",
+]
+
+
+MIGRATIONS = [
+    (1, 'baseline schema', _execute(*BASELINE)),
+    (2, 'catalog keyset pagination indexes', _execute(
+        'CREATE INDEX IF NOT EXISTS ix_game_release_date_id ON game (release_date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_game_publisher_id_release_date ON game (publisher_id, release_date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_game_genre_release_date ON game (genre, release_date, id)')),
+    (3, 'customer history indexes', _execute(
+        'CREATE INDEX IF NOT EXISTS ix_purchase_customer_id ON purchase (customer_id)',
+        'CREATE INDEX IF NOT EXISTS ix_return_customer_id ON "return" (customer_id)')),
+    (4, 'purchase idempotency keys', _steps(
+        _add_column('purchase', 'idempotency_key', 'VARCHAR(64)'),
+        _execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_purchase_idempotency_key ON purchase (idempotency_key)'))),
+    (5, 'catalog import checkpoints', _execute(
+        """CREATE TABLE IF NOT EXISTS import_progress (
+            source VARCHAR(255) NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (source))""")),
+    (6, 'full-text game search', _execute(*GAME_SEARCH)),
+    (7, 'catalog change log', _execute(*CATALOG_CHANGE_LOG)),
+    (8, 'hot-path lookup indexes', _execute(
+        'CREATE INDEX IF NOT EXISTS ix_game_game_name ON game (game_name)',
+        'CREATE INDEX IF NOT EXISTS ix_run_game_id ON run (game_id)')),
+    (9, 'balance ledger', _execute(*BALANCE_LEDGER)),
+    (10, 'non-destructive returns', _steps(
+        _add_column('purchase', 'status', "VARCHAR(8) NOT NULL DEFAULT 'active'"),
+        _execute('DROP TRIGGER IF EXISTS delete_purchase',
+                 "CREATE INDEX IF NOT EXISTS ix_purchase_customer_id_active ON purchase (customer_id, id) "
+                 "WHERE status = 'active'",
+                 'CREATE INDEX IF NOT EXISTS ix_return_purchase_id ON "return" (purchase_id)'))),
+    (11, 'sales summary tables', _execute(*SALES_SUMMARIES)),
+    (12, 'local poster cache', _execute(*POSTER_CACHE)),
+    (13, 'background job queue', _execute(*JOB_QUEUE)),
+    (14, 'release dates on runs', _steps(
+        _add_column('run', 'release_date', 'DATE'),
+        _execute('UPDATE run SET release_date = (SELECT release_date FROM game WHERE game.id = run.game_id)',
+                 'CREATE INDEX IF NOT EXISTS ix_run_platform_id_release_date '
+                 'ON run (platform_id, release_date, game_id)',
+                 *RUN_RELEASE_DATE_TRIGGERS))),
+    (15, 'purchase unit prices', _steps(
+        _add_column('purchase', 'unit_price', 'NUMERIC(4, 2)'),
+        # Earlier purchases did not record their price; the current one is the best estimate left.
+        _execute('UPDATE purchase SET unit_price = (SELECT price FROM game WHERE game.id = purchase.game_id) '
+                 'WHERE unit_price IS NULL'))),
+    (16, 'sales summaries at the price paid', _execute(*PAID_PRICE_SALES)),
+    (17, 'poster download retries', _steps(
+        _add_column('poster_image', 'attempts', "INTEGER NOT NULL DEFAULT '1'"),
+        _add_column('poster_image', 'retry_at', 'DATETIME'),
+        # Failures recorded before retries existed are due at once.
+        _execute('UPDATE poster_image SET retry_at = date WHERE digest IS NULL AND retry_at IS NULL'))),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(connection):
+    return connection.execute(text('PRAGMA user_version')).scalar()
+
+
+def upgrade(connection, target=LATEST_VERSION, report=None):
+    current = schema_version(connection)
+    for version, description, migrate in MIGRATIONS:
+        if current < version <= target:
+            migrate(connection)
+            connection.execute(text(f'PRAGMA user_version = {version}'))
+            if report:
+                report(version, description)
+    return schema_version(connection)
@@ -0,0 +1,73 @@
+import datetime
+import email.message
+import email.utils
+import os
+import smtplib
+import tempfile
+import uuid
+from game_store import app, db
+from game_store.jobs import job_handler
+from game_store.models import Customer, Game
+
+
+app.config.setdefault('MAIL_SERVER', os.environ.get('GAME_STORE_MAIL_SERVER'))
+app.config.setdefault('MAIL_SENDER', 'Game Store <noreply@game-store.local>')
+app.config.setdefault('MAIL_TIMEOUT', 10)
+app.config.setdefault('MAIL_OUTBOX_DIR', os.path.join(app.instance_path, 'outbox'))
+
+
+# Mail goes to MAIL_SERVER (host[:port], GAME_STORE_MAIL_SERVER) when one is configured; otherwise every message
+# is written to MAIL_OUTBOX_DIR as an .eml file, which is what development and tests look at.
+def send_mail(to, subject, body):
+    message = email.message.EmailMessage()
+    message['From'] = app.config['MAIL_SENDER']
+    message['To'] = to
+    message['Subject'] = subject
+    message['Date'] = email.utils.formatdate(localtime=True)
+    message['Message-ID'] = email.utils.make_msgid(domain='game-store.local')
+    message.set_content(body)
+    if app.config['MAIL_SERVER']:
+        host, _, port = app.config['MAIL_SERVER'].partition(':')
+        with smtplib.SMTP(host, int(port or 25), timeout=app.config['MAIL_TIMEOUT']) as smtp:
+            smtp.send_message(message)
+        return
+    directory = app.config['MAIL_OUTBOX_DIR']
+    os.makedirs(directory, exist_ok=True)
+    name = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.eml"
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(message.as_bytes())
+    os.replace(tmp, os.path.join(directory, name))
+
+
+def _customer(customer_id):
+    customer = db.session.get(Customer, customer_id)
+    if customer is None:
+        raise LookupError(f'customer {customer_id} not found')
+    return customer
+
+
+@job_handler('purchase_receipt')
+def purchase_receipt(payload):
+    customer = _customer(payload['customer_id'])
+    names = dict(db.session.query(Game.id, Game.game_name).filter(Game.id.in_([int(i) for i in payload['lines']])))
+    lines = '\n'.join(f"  {names.get(int(game_id), game_id)} × {qty}" for game_id, qty in payload['lines'].items())
+    send_mail(customer.email, 'Чек покупки',
+              f"Здравствуйте, {customer.username}!\n\nВы купили:\n{lines}\n\nИтого: {payload['total']}\n"
+              f"Дата: {payload['date']}\n")
+
+
+@job_handler('refund_receipt')
+def refund_receipt(payload):
+    customer = _customer(payload['customer_id'])
+    send_mail(customer.email, 'Возврат средств',
+              f"Здравствуйте, {customer.username}!\n\nЗаказ {payload['purchase_id']} ({payload['game_name']}) "
+              f"возвращён, на счёт зачислено {payload['amount']}.\n")
+
+
+@job_handler('welcome')
+def welcome(payload):
+    customer = _customer(payload['customer_id'])
+    send_mail(customer.email, 'Добро пожаловать в Game Store',
+              f"Здравствуйте, {customer.username}!\n\nАккаунт создан, на счёт зачислен приветственный баланс "
+              f"{payload['balance']}.\n")
@@ -0,0 +1,172 @@
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from flask import request, session, make_response
+from flask_login import current_user
+from game_store import app
+from game_store.changes import current_version
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows: renders are serialized within the process only
+    fcntl = None
+
+
+app.config.setdefault('PAGE_CACHE_ENABLED', True)
+app.config.setdefault('PAGE_CACHE_DIR', os.path.join(app.instance_path, 'page_cache'))
+app.config.setdefault('PAGE_CACHE_TTL', 300)
+app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', 1000)
+
+# The only query argument a cached view reads. Any other one is not part of the cache key, and page_url() copies
+# it into the page's links, so such requests are rendered fresh rather than each filling a cache file.
+CACHED_ARGS = {'after'}
+
+
+# Rendered catalog pages for anonymous visitors, stored as files named <catalog version>-<hash of path and args>
+# so every worker process shares them. A new catalog version makes every old name unreachable, and the first
+# miss after the change deletes the files of older versions. Within a version, a miss deletes expired files
+# once per PAGE_CACHE_TTL and, past PAGE_CACHE_MAX_ENTRIES, the least recently written ones. A cold key is
+# rendered under an exclusive flock on its .lock file: concurrent requests for it wait, then read what the first
+# one wrote.
+class PageCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.render_lock = threading.Lock()
+        self.pruned = None
+        self.swept = 0
+        self.hits = self.misses = self.waits = 0
+
+    def _directory(self):
+        return app.config['PAGE_CACHE_DIR']
+
+    def _read(self, path):
+        try:
+            with open(path + '.page', 'rb') as f:
+                meta = json.loads(f.readline())
+                if time.time() - meta['modified'] >= app.config['PAGE_CACHE_TTL']:
+                    return None
+                return meta, f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, path, meta, body):
+        fd, tmp = tempfile.mkstemp(dir=self._directory(), prefix=os.path.basename(path) + '.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps(meta).encode() + b'\n')
+            f.write(body)
+        os.replace(tmp, path + '.page')
+
+    def _prune(self, version):
+        if self.pruned == version:
+            return
+        self.pruned = version
+        for name in os.listdir(self._directory()):
+            prefix = name.split('-', 1)[0]
+            if prefix.isdigit() and int(prefix) < version:
+                try:
+                    os.remove(os.path.join(self._directory(), name))
+                except OSError:
+                    pass
+
+    def _remove(self, name):
+        for suffix in ('.page', '.lock'):
+            try:
+                os.remove(os.path.join(self._directory(), name + suffix))
+            except OSError:
+                pass
+
+    # Evicts down to three quarters of the cap, so that a full cache is not swept again on the very next miss.
+    def _sweep(self):
+        now, ttl, limit = time.time(), app.config['PAGE_CACHE_TTL'], app.config['PAGE_CACHE_MAX_ENTRIES']
+        names = [name[:-len('.page')] for name in os.listdir(self._directory()) if name.endswith('.page')]
+        if len(names) <= limit and now - self.swept < ttl:
+            return
+        self.swept = now
+        entries = []
+        for name in names:
+            try:
+                entries.append((os.path.getmtime(os.path.join(self._directory(), name + '.page')), name))
+            except OSError:
+                pass
+        entries.sort(reverse=True)
+        keep = limit if len(names) <= limit else limit * 3 // 4
+        for position, (modified, name) in enumerate(entries):
+            if position >= keep or now - modified >= ttl:
+                self._remove(name)
+
+    @contextmanager
+    def _single_flight(self, path):
+        if fcntl is None:
+            with self.render_lock:
+                yield
+            return
+        with open(path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _render(self, path, view):
+        response = make_response(view())
+        if response.status_code != 200:
+            return None, response
+        body = response.get_data()
+        meta = {'etag': hashlib.sha1(body).hexdigest(), 'modified': int(time.time()), 'mimetype': response.mimetype}
+        self._write(path, meta, body)
+        return (meta, body), None
+
+    def respond(self, view):
+        version = current_version()
+        args = urlencode(sorted(request.args.items(multi=True)))
+        path = os.path.join(self._directory(),
+                            f"{version}-{hashlib.sha1(f'{request.path}?{args}'.encode()).hexdigest()}")
+        entry = self._read(path)
+        counter = 'hits'
+        if entry is None:
+            os.makedirs(self._directory(), exist_ok=True)
+            self._prune(version)
+            self._sweep()
+            with self._single_flight(path):
+                entry = self._read(path)
+                counter = 'waits'
+                if entry is None:
+                    counter = 'misses'
+                    entry, response = self._render(path, view)
+                    if entry is None:
+                        return response
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        meta, body = entry
+        response = app.response_class(body, mimetype=meta['mimetype'])
+        response.set_etag(meta['etag'])
+        response.last_modified = meta['modified']
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'waits': self.waits}
+
+
+page_cache = PageCache()
+
+
+# For GET views whose HTML depends only on the URL and the catalog. Logged-in visitors, responses that would
+# carry a flashed message and query arguments other than CACHED_ARGS always get a fresh render.
+def cached_page(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if (not app.config['PAGE_CACHE_ENABLED'] or request.method not in ('GET', 'HEAD')
+                or current_user.is_authenticated or session.get('_flashes')
+                or not CACHED_ARGS.issuperset(request.args)):
+            return view(*args, **kwargs)
+        return page_cache.respond(lambda: view(*args, **kwargs))
+    return wrapper
@@ -0,0 +1,133 @@
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import time
+from sqlalchemy import update
+from game_store import app, bcrypt, db
+from game_store.metrics import metrics
+from game_store.models import Customer
+
+
+app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)
+app.config.setdefault('PASSWORD_HASH_CONCURRENCY', 1)
+app.config.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', 1.0)
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+def _cost(password_hash):
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+# bcrypt is deliberately slow and releases the GIL, so a login storm could otherwise occupy every core and
+# leave catalog requests waiting behind it. Every hash and check takes one of PASSWORD_HASH_CONCURRENCY slots
+# first. The slots are a process-shared semaphore: the prefork server creates it (start()) before forking, so
+# the cap holds for the whole machine; a request that waits longer than PASSWORD_HASH_QUEUE_TIMEOUT for a slot
+# gets PasswordHashingBusy instead of holding its worker. Queue and hashing times go to /metrics per operation.
+# Hashes made with a cost other than BCRYPT_LOG_ROUNDS are replaced after a successful login by one background
+# thread, which skips the work when no slot is free; the next login tries again.
+class PasswordHasher:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = None
+        self.executor = None
+        self.pending = set()
+        self.rejected = self.rehashed = 0
+
+    def _after_fork(self):
+        # The slots stay shared with the parent; the rehash thread does not survive fork.
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pending = set()
+
+    def start(self):
+        with self.lock:
+            if self.slots is None:
+                self.slots = multiprocessing.BoundedSemaphore(app.config['PASSWORD_HASH_CONCURRENCY'])
+            return self.slots
+
+    def _run(self, operation, function, *args):
+        slots = self.slots or self.start()
+        queued = time.perf_counter()
+        if not slots.acquire(timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT']):
+            with self.lock:
+                self.rejected += 1
+            raise PasswordHashingBusy()
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            slots.release()
+            metrics.observe('password_queue_seconds', operation, started - queued)
+            metrics.observe('password_hash_seconds', operation, time.perf_counter() - started)
+
+    def hash(self, password, operation='hash'):
+        return self._run(operation, bcrypt.generate_password_hash, password,
+                         app.config['BCRYPT_LOG_ROUNDS']).decode('utf-8')
+
+    def verify(self, password_hash, password):
+        return self._run('verify', bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return _cost(password_hash) != app.config['BCRYPT_LOG_ROUNDS']
+
+    def rehash_later(self, customer_id, password_hash, password):
+        with self.lock:
+            if customer_id in self.pending:
+                return
+            self.pending.add(customer_id)
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='rehash')
+        self.executor.submit(self._rehash, customer_id, password_hash, password)
+
+    def _rehash(self, customer_id, password_hash, password):
+        try:
+            new_hash = self.hash(password, 'rehash')
+            with app.app_context():
+                try:
+                    # Only replaces the hash the login was checked against, never a password changed meanwhile.
+                    db.session.execute(update(Customer)
+                                       .where(Customer.id == customer_id, Customer.password == password_hash)
+                                       .values(password=new_hash)
+                                       .execution_options(synchronize_session=False))
+                    db.session.commit()
+                finally:
+                    db.session.remove()
+            with self.lock:
+                self.rehashed += 1
+        except PasswordHashingBusy:
+            pass
+        except Exception:
+            app.logger.exception('rehashing the password of customer %s failed', customer_id)
+        finally:
+            with self.lock:
+                self.pending.discard(customer_id)
+
+    def stats(self):
+        with self.lock:
+            return {'rejected': self.rejected, 'rehashed': self.rehashed}
+
+
+password_hasher = PasswordHasher()
+os.register_at_fork(after_in_child=password_hasher._after_fork)
+
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+
+# Returns the customer when the password matches, otherwise None. Raises PasswordHashingBusy when no hashing
+# slot frees up in time.
+def authenticate(email, password):
+    customer = Customer.query.filter_by(email=email).first()
+    if customer is None or not password_hasher.verify(customer.password, password):
+        return None
+    if password_hasher.needs_rehash(customer.password):
+        password_hasher.rehash_later(customer.id, customer.password, password)
+    return customer
@@ -0,0 +1,198 @@
+import concurrent.futures
+import datetime
+import hashlib
+import http.client
+import io
+import os
+import tempfile
+import threading
+import urllib.request
+from flask import send_from_directory, url_for
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import or_
+from game_store import app, db
+from game_store.models import Game, PosterImage
+
+
+app.config.setdefault('POSTER_DIR', os.path.join(app.instance_path, 'posters'))
+app.config.setdefault('POSTER_WIDTHS', (160, 320))
+app.config.setdefault('POSTER_LIST_WIDTH', 320)
+app.config.setdefault('POSTER_WORKERS', 4)
+app.config.setdefault('POSTER_TIMEOUT', 10)
+app.config.setdefault('POSTER_MAX_BYTES', 10 * 2 ** 20)
+app.config.setdefault('POSTER_FETCH_ON_DEMAND', True)
+app.config.setdefault('POSTER_RETRY_AFTER', 3600)
+app.config.setdefault('POSTER_RETRY_MAX', 7 * 24 * 3600)
+
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+
+class PosterError(Exception):
+    pass
+
+
+def download(url, opener=None):
+    if not url.startswith(('http://', 'https://')):
+        raise PosterError('unsupported poster URL')
+    request = urllib.request.Request(url, headers={'User-Agent': 'game-store-posters/1.0'})
+    with (opener or urllib.request.urlopen)(request, timeout=app.config['POSTER_TIMEOUT']) as response:
+        body = response.read(app.config['POSTER_MAX_BYTES'] + 1)
+    if len(body) > app.config['POSTER_MAX_BYTES']:
+        raise PosterError('poster is too large')
+    return body
+
+
+def _write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# Files are named after the SHA-256 of the original bytes, so a URL is never needed to find them, games sharing
+# an image share the files, and a file never changes once written, which is what lets /posters/ mark responses
+# immutable. Next to the original go WebP thumbnails, one per POSTER_WIDTHS entry.
+def store(body):
+    try:
+        image = Image.open(io.BytesIO(body))
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as error:
+        raise PosterError(f'not an image ({type(error).__name__})')
+    extension = EXTENSIONS.get(image.format)
+    if extension is None:
+        raise PosterError(f'unsupported image format {image.format}')
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    directory = app.config['POSTER_DIR']
+    os.makedirs(directory, exist_ok=True)
+    original = os.path.join(directory, digest + extension)
+    if not os.path.exists(original):
+        _write(original, body)
+    for width in app.config['POSTER_WIDTHS']:
+        path = os.path.join(directory, f'{digest}-{width}.webp')
+        if os.path.exists(path):
+            continue
+        thumbnail = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        thumbnail.thumbnail((width, width * 3))
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, 'WEBP', quality=80)
+        _write(path, buffer.getvalue())
+    return digest, extension
+
+
+# The wait after a failed attempt doubles with every attempt, from POSTER_RETRY_AFTER up to POSTER_RETRY_MAX.
+def retry_delay(attempts):
+    seconds = app.config['POSTER_RETRY_AFTER'] * 2 ** min(attempts - 1, 32)
+    return datetime.timedelta(seconds=min(seconds, app.config['POSTER_RETRY_MAX']))
+
+
+# Posters are fetched once per source URL by a bounded thread pool, either all at once by `flask fetch-posters`
+# or on demand the first time a page shows a poster that is not cached yet; that page still links the original
+# URL. poster_image records the last attempt for every URL, so no process fetches a cached poster twice; a
+# failure is stored with the time from which it may be tried again, on demand or by the next fetch-posters.
+class PosterFetcher:
+    def __init__(self, opener=None):
+        self.lock = threading.Lock()
+        self.opener = opener
+        self.known = None
+        self.retry_at = {}
+        self.pending = set()
+        self.executor = None
+
+    def _after_fork(self):
+        # Threads do not survive fork: a child starts with no pool and nothing in flight.
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.executor = None
+
+    def load(self):
+        rows = db.session.query(PosterImage.source_url, PosterImage.digest, PosterImage.retry_at).all()
+        self.known = {url: digest for url, digest, _ in rows}
+        self.retry_at = {url: retry_at for url, digest, retry_at in rows if digest is None}
+
+    def _due(self, source_url):
+        if source_url not in self.known:
+            return True
+        retry_at = self.retry_at.get(source_url)
+        return retry_at is None or retry_at <= datetime.datetime.now()
+
+    def url(self, source_url, width=None):
+        if self.known is None:
+            self.load()
+        digest = self.known.get(source_url)
+        if digest is not None:
+            return url_for('poster', filename=f"{digest}-{width or app.config['POSTER_LIST_WIDTH']}.webp")
+        if app.config['POSTER_FETCH_ON_DEMAND'] and self._due(source_url):
+            self.submit(source_url)
+        return source_url
+
+    def submit(self, source_url):
+        with self.lock:
+            if source_url in self.pending:
+                return None
+            self.pending.add(source_url)
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(app.config['POSTER_WORKERS'],
+                                                                      thread_name_prefix='poster')
+        return self.executor.submit(self._fetch, source_url)
+
+    def _fetch(self, source_url):
+        try:
+            with app.app_context():
+                try:
+                    row = db.session.get(PosterImage, source_url)
+                    now = datetime.datetime.now()
+                    if row is None or row.digest is None and (row.retry_at is None or row.retry_at <= now):
+                        attempts = row.attempts + 1 if row is not None else 1
+                        try:
+                            digest, extension = store(download(source_url, self.opener))
+                            row = PosterImage(source_url, now, digest, extension, attempts=attempts)
+                        except (PosterError, OSError, http.client.HTTPException, ValueError) as error:
+                            row = PosterImage(source_url, now, error=str(error)[:200], attempts=attempts,
+                                              retry_at=now + retry_delay(attempts))
+                        row = db.session.merge(row)
+                        db.session.commit()
+                    if self.known is not None:
+                        self.known[source_url] = row.digest
+                        if row.digest is None:
+                            self.retry_at[source_url] = row.retry_at
+                        else:
+                            self.retry_at.pop(source_url, None)
+                    return row.digest
+                finally:
+                    db.session.remove()
+        finally:
+            with self.lock:
+                self.pending.discard(source_url)
+
+    # Fetches every poster never tried and every failed one whose retry is due; retry_failed makes all failed
+    # ones due now, keeping their attempt counts.
+    def fetch_all(self, retry_failed=False):
+        now = datetime.datetime.now()
+        if retry_failed:
+            PosterImage.query.filter(PosterImage.digest.is_(None)) \
+                .update({PosterImage.retry_at: now}, synchronize_session=False)
+            db.session.commit()
+        missing = [url for url, in db.session.query(Game.poster).distinct()
+                   .outerjoin(PosterImage, PosterImage.source_url == Game.poster)
+                   .filter(or_(PosterImage.source_url.is_(None),
+                               PosterImage.digest.is_(None) & (PosterImage.retry_at <= now)))]
+        futures = [future for future in map(self.submit, missing) if future is not None]
+        digests = [future.result() for future in futures]
+        return {'fetched': sum(digest is not None for digest in digests),
+                'failed': sum(digest is None for digest in digests)}
+
+
+poster_fetcher = PosterFetcher()
+os.register_at_fork(after_in_child=poster_fetcher._after_fork)
+
+
+@app.template_global()
+def poster_url(source_url, width=None):
+    return poster_fetcher.url(source_url, width)
+
+
+@app.route('/posters/<path:filename>')
+def poster(filename):
+    response = send_from_directory(app.config['POSTER_DIR'], filename, max_age=365 * 24 * 3600)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
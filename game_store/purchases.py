@@ -0,0 +1,121 @@
+import datetime
+import random
+import time
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from game_store import app, db
+from game_store.jobs import enqueue
+from game_store.ledger import credit, debit, InsufficientFunds
+from game_store.models import Purchase, Return, Game
+
+
+app.config.setdefault('PURCHASE_RETRIES', 5)
+app.config.setdefault('PURCHASE_RETRY_BACKOFF', 0.05)
+
+
+def _is_busy(error):
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def top_up(customer_id, amount):
+    credit(customer_id, amount, 'top_up')
+    db.session.commit()
+
+
+def _retrying(operation, *args):
+    retries = app.config['PURCHASE_RETRIES']
+    for attempt in range(retries):
+        try:
+            return operation(*args)
+        except OperationalError as error:
+            db.session.rollback()
+            if not _is_busy(error) or attempt == retries - 1:
+                raise
+            time.sleep(app.config['PURCHASE_RETRY_BACKOFF'] * 2 ** attempt * random.uniform(0.5, 1))
+
+
+def returnable_purchase(customer_id, purchase_id):
+    return db.session.query(Purchase.id, Purchase.qty, Game.game_name,
+                            (Purchase.unit_price * Purchase.qty).label('amount')) \
+        .join(Game, Game.id == Purchase.game_id) \
+        .filter(Purchase.id == purchase_id, Purchase.customer_id == customer_id, Purchase.status == 'active') \
+        .first()
+
+
+def _refund(customer_id, purchase_id):
+    # Moving the purchase from active to returned is the guard: the UPDATE matches only an active purchase of
+    # this customer, so a double submit or two racing requests refund it once. The purchase row is kept.
+    result = db.session.execute(
+        update(Purchase)
+        .where(Purchase.id == purchase_id, Purchase.customer_id == customer_id, Purchase.status == 'active')
+        .values(status='returned')
+        .execution_options(synchronize_session=False))
+    if result.rowcount != 1:
+        db.session.rollback()
+        return None
+    # The refund is what the customer paid, whatever the game costs today.
+    amount, game_name = db.session.query(Purchase.unit_price * Purchase.qty, Game.game_name).select_from(Purchase) \
+        .join(Game, Game.id == Purchase.game_id).filter(Purchase.id == purchase_id).one()
+    db.session.execute(Return.__table__.insert(), {
+        'customer_id': customer_id, 'date': datetime.datetime.now(), 'purchase_id': purchase_id})
+    if amount > 0:
+        credit(customer_id, amount, 'refund', str(purchase_id))
+    enqueue('refund_receipt', {'customer_id': customer_id, 'purchase_id': purchase_id, 'game_name': game_name,
+                               'amount': str(amount)})
+    db.session.commit()
+    return amount
+
+
+# Returns the refunded amount, or None when the purchase is not the customer's or was already returned.
+def refund(customer_id, purchase_id):
+    return _retrying(_refund, customer_id, purchase_id)
+
+
+def _line_key(idempotency_key, game_id):
+    return None if idempotency_key is None else f"{idempotency_key}:{game_id}"
+
+
+def _already_placed(idempotency_key, lines):
+    if idempotency_key is None:
+        return False
+    keys = [_line_key(idempotency_key, game_id) for game_id in lines]
+    return db.session.query(Purchase.id).filter(Purchase.idempotency_key.in_(keys)).first() is not None
+
+
+def _checkout(customer_id, lines, idempotency_key):
+    prices = dict(db.session.query(Game.id, Game.price).filter(Game.id.in_(list(lines))))
+    lines = {game_id: qty for game_id, qty in lines.items() if game_id in prices}
+    total = sum(prices[game_id] * qty for game_id, qty in lines.items())
+    if not lines or _already_placed(idempotency_key, lines):
+        return total
+    now = datetime.datetime.now()
+    try:
+        if total > 0:
+            debit(customer_id, total, 'purchase', idempotency_key)
+        db.session.execute(Purchase.__table__.insert(), [
+            {'customer_id': customer_id, 'date': now, 'game_id': game_id, 'qty': qty, 'unit_price': prices[game_id],
+             'idempotency_key': _line_key(idempotency_key, game_id)}
+            for game_id, qty in lines.items()])
+        enqueue('purchase_receipt', {'customer_id': customer_id, 'lines': lines, 'total': str(total),
+                                     'date': now.isoformat(sep=' ', timespec='seconds')})
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent submit with the same key committed first; our debit is rolled back with the insert.
+        db.session.rollback()
+        if not _already_placed(idempotency_key, lines):
+            raise
+    except InsufficientFunds:
+        db.session.rollback()
+        raise
+    return total
+
+
+# lines maps game id to quantity. The whole order is priced in one query, debited once and inserted with a
+# single executemany, so it costs one transaction (and one fsync) however many titles it contains.
+def checkout(customer_id, lines, idempotency_key=None):
+    return _retrying(_checkout, customer_id, lines, idempotency_key)
+
+
+def buy_game(customer_id, game, qty, idempotency_key=None):
+    return checkout(customer_id, {game.id: qty}, idempotency_key)
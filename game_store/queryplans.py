@@ -0,0 +1,164 @@
+import contextlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import uuid
+from sqlalchemy import event
+from game_store import app, db
+from game_store.models import Customer, Game, Purchase, Run
+
+
+LARGE_TABLES = {'customer', 'purchase', 'return', 'game', 'run', 'catalog_change', 'ledger_entry'}
+
+# Statements that read a whole table on purpose. Each one runs once per process or per cache period,
+# never once per request.
+ALLOWED_FULL_SCANS = [
+    'SELECT id, genre, publisher_id, price, release_date FROM game',    # facet index rebuild
+    'SELECT platform_id, game_id FROM run',                              # facet index rebuild
+    'SELECT DISTINCT game.genre',                                        # cached genre list
+    'SELECT customer_id, game_id FROM (',                               # recommendation rebuild
+]
+
+# Statements that sort on purpose: the rows sorted are a bounded set of matches, not a table.
+ALLOWED_SORTS = [
+    'SELECT game.id, game.game_name FROM game_fts',                     # search results ranked by bm25
+]
+
+
+def _sample_requests():
+    game = Game.query.order_by(Game.id).first()
+    run = Run.query.first()
+    purchase = Purchase.query.filter(Purchase.customer_id.isnot(None), Purchase.status == 'active') \
+        .order_by(Purchase.id.desc()).first()
+    customer_id = purchase.customer_id if purchase else db.session.query(Customer.id).limit(1).scalar()
+    anonymous = [
+        '/', '/gamelist', '/catalog', '/catalog?platform=1&genre=rpg&year_min=2000&price_max=50', '/genres',
+        '/platforms', '/publisher', '/search?q=creed', '/search/autocomplete?q=cr',
+    ]
+    authenticated = ['/account', '/cart']
+    if game:
+        anonymous += [f'/show_publisher/{game.publisher_id}', f'/show_genre/{game.genre}',
+                      f'/gamelist?after={game.release_date.isoformat()}_{game.id}']
+        authenticated.append(f'/game/{game.game_name}')
+    if run:
+        anonymous.append(f'/show_platform/{run.platform_id}')
+    if purchase:
+        authenticated.append(f'/returns/{purchase.id}')
+    return anonymous, authenticated, customer_id
+
+
+# (url, form data, cart) for the routes that write: a failed login, a purchase, a checkout, a top-up and a return.
+def _sample_posts(customer_id):
+    game = Game.query.order_by(Game.id).first()
+    purchase = Purchase.query.filter(Purchase.customer_id == customer_id, Purchase.status == 'active') \
+        .order_by(Purchase.id.desc()).first()
+    email = db.session.query(Customer.email).filter(Customer.id == customer_id).scalar()
+    anonymous = [('/login', {'email': email or 'nobody@example.com', 'password': 'not the password'}, None)]
+    authenticated = [('/account', {'submit': '1'}, None)]
+    if game:
+        authenticated += [
+            (f'/game/{game.game_name}', {'quantity': 1, 'idempotency_key': uuid.uuid4().hex}, None),
+            ('/checkout', {'idempotency_key': uuid.uuid4().hex}, {str(game.id): 1})]
+    if purchase:
+        authenticated.append((f'/returns/{purchase.id}', {'submit': '1'}, None))
+    return anonymous, authenticated
+
+
+def _capture(requests, customer_id=None):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE',
+                                                                                'DELETE'):
+            statements.append((statement, parameters))
+
+    client = app.test_client()
+    if customer_id is not None:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(customer_id)
+    # A page served from the page cache issues no SQL, so the cache is bypassed while statements are collected,
+    # and rendering the sample pages should not start poster downloads. Forms are posted without CSRF tokens.
+    switches = ('PAGE_CACHE_ENABLED', 'POSTER_FETCH_ON_DEMAND', 'WTF_CSRF_ENABLED')
+    saved = {key: app.config.get(key, True) for key in switches}
+    app.config.update(dict.fromkeys(saved, False))
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for request in requests:
+            if isinstance(request, str):
+                client.get(request)
+                continue
+            url, data, cart = request
+            if cart is not None:
+                with client.session_transaction() as session:
+                    session['cart'] = cart
+            client.post(url, data=data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+        app.config.update(saved)
+    return statements
+
+
+# The POST routes write, so they are replayed against a copy of the database that is deleted afterwards.
+@contextlib.contextmanager
+def _scratch_copy():
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'query_plans.db')
+    source = db.engine.raw_connection()
+    try:
+        with contextlib.closing(sqlite3.connect(path)) as target:
+            source.connection.backup(target)
+    finally:
+        source.close()
+    saved = app.config['SQLALCHEMY_DATABASE_URI']
+    db.session.remove()
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    try:
+        yield
+    finally:
+        db.session.remove()
+        db.get_engine(app).dispose()
+        app.config['SQLALCHEMY_DATABASE_URI'] = saved
+        shutil.rmtree(workdir)
+
+
+def full_scans(statement, parameters):
+    plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    tables = {match.group(1) for match in (re.match(r'(?:SCAN|SEARCH) (\w+)', row[-1]) for row in plan) if match}
+    problems = []
+    for row in plan:
+        detail = row[-1]
+        # Sorting rows read from a large table costs as much as reading them all, whatever the LIMIT.
+        if detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail and tables & LARGE_TABLES:
+            if not any(statement.startswith(prefix) for prefix in ALLOWED_SORTS):
+                problems.append(detail)
+            continue
+        match = re.match(r'SCAN (\w+)( USING (COVERING )?INDEX \w+)?', detail)
+        if not match or match.group(1) not in LARGE_TABLES:
+            continue
+        # An ordered index walk that stops at a LIMIT is how keyset pagination reads; anything else is a full scan.
+        if match.group(2) and re.search(r'\bLIMIT\b', statement, re.IGNORECASE):
+            continue
+        problems.append(detail)
+    return problems
+
+
+# Replays the GET routes against the current database and the POST routes against a scratch copy, collects
+# every statement they issue and runs EXPLAIN QUERY PLAN on it. Returns [(statement, [offending plan lines])]
+# for statements that scan a large table or sort its rows in a temporary B-tree.
+def check_query_plans():
+    anonymous, authenticated, customer_id = _sample_requests()
+    posts_anonymous, posts_authenticated = _sample_posts(customer_id)
+    statements = _capture(anonymous) + _capture(authenticated, customer_id)
+    with _scratch_copy():
+        statements += _capture(posts_anonymous) + _capture(posts_authenticated, customer_id)
+    failures, seen = [], set()
+    for statement, parameters in statements:
+        if statement in seen or any(statement.startswith(prefix) for prefix in ALLOWED_FULL_SCANS):
+            continue
+        seen.add(statement)
+        problems = full_scans(statement, parameters)
+        if problems:
+            failures.append((statement, problems))
+    return len(seen), failures
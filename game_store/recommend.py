@@ -0,0 +1,173 @@
+import itertools
+import os
+import threading
+import time
+from sqlalchemy import text
+from game_store import app, db
+from game_store.models import Game
+
+
+app.config.setdefault('RECOMMEND_TOP_K', 6)
+app.config.setdefault('RECOMMEND_MAX_ITEMS_PER_CUSTOMER', 50)
+app.config.setdefault('RECOMMEND_REFRESH_INTERVAL', 5.0)
+app.config.setdefault('RECOMMEND_REBUILD_INTERVAL', 3600)
+app.config.setdefault('RECOMMEND_REBUILD_THRESHOLD', 10000)
+app.config.setdefault('RECOMMEND_CHUNK_SIZE', 2048)
+
+# Only a customer's most recent distinct titles count: the co-occurrence work of one basket grows with the square
+# of its size, and a handful of collectors with thousands of titles would otherwise dominate both the build
+# and the results.
+PAIRS_SQL = """SELECT customer_id, game_id FROM (
+        SELECT customer_id, game_id,
+               row_number() OVER (PARTITION BY customer_id ORDER BY max(id) DESC) AS recent
+        FROM purchase
+        WHERE status = 'active' AND customer_id IS NOT NULL AND game_id IS NOT NULL
+        GROUP BY customer_id, game_id)
+    WHERE recent <= :cap"""
+NEW_PURCHASES_SQL = """SELECT id, customer_id, game_id FROM purchase
+    WHERE id > :high AND status = 'active' AND customer_id IS NOT NULL AND game_id IS NOT NULL
+    ORDER BY id LIMIT :limit"""
+
+
+# numpy and scipy are imported where the matrices are built, not at module level: they add about a quarter of a
+# second to every import of the app, and only the process that builds recommendations needs them.
+def _top_k(counts, game_ids, buyers, k):
+    import numpy as np
+    from scipy import sparse
+    # Scores are co-buyers / sqrt(buyers of the candidate), so titles everybody owns do not top every list.
+    # Dividing by sqrt(buyers of the game itself) as well would not change the order within a row.
+    scale = np.zeros_like(buyers, dtype=np.float32)
+    scale[buyers > 0] = 1 / np.sqrt(buyers[buyers > 0])
+    scores = (counts @ sparse.diags(scale)).tocsr()
+    top = np.full((len(game_ids), k), -1, dtype=np.int32)
+    for row, game_id in enumerate(game_ids):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        candidates, values = scores.indices[start:end], scores.data[start:end]
+        keep = candidates != game_id
+        candidates, values = candidates[keep], values[keep]
+        if len(values) > k:
+            best = np.argpartition(-values, k)[:k]
+            candidates, values = candidates[best], values[best]
+        order = np.lexsort((candidates, -values))
+        top[row, :len(order)] = candidates[order]
+    return top
+
+
+# "Customers also bought": owned is a customers x games sparse 0/1 matrix, and the co-occurrence rows of a set of
+# games are owned[:, games].T @ owned, computed in chunks so the full games x games matrix never exists at once.
+# Only the k best neighbours of every game are kept, in a dense games x k table that requests read without any
+# computation. New purchases are folded in by recomputing the rows of the games they touch; the normalization
+# of untouched rows drifts a little until the next full rebuild every RECOMMEND_REBUILD_INTERVAL seconds, which
+# also drops returned purchases. Requests never do either: refresh() at most starts a background thread for the
+# fold or the rebuild, which swaps the new table in when it is done.
+class Recommender:
+    def __init__(self):
+        self.updating = threading.Lock()
+        self.owned = None
+        self.top = None
+        self.high = None
+        self.built = 0.0
+        self.checked = 0.0
+        self.running = False
+
+    def _after_fork(self):
+        # An update thread running in the parent at fork time does not exist in the child.
+        self.updating = threading.Lock()
+        self.running = False
+
+    def _similar(self, owned, game_ids):
+        import numpy as np
+        k = app.config['RECOMMEND_TOP_K']
+        by_game = owned.tocsc()
+        buyers = np.asarray(by_game.sum(axis=0)).ravel()
+        chunk = app.config['RECOMMEND_CHUNK_SIZE']
+        parts = [_top_k((by_game[:, game_ids[start:start + chunk]].T @ owned).tocsr(),
+                        game_ids[start:start + chunk], buyers, k)
+                 for start in range(0, len(game_ids), chunk)]
+        return np.vstack(parts) if parts else np.full((0, k), -1, dtype=np.int32)
+
+    def rebuild(self):
+        with self.updating:
+            self._rebuild()
+
+    def _rebuild(self):
+        import numpy as np
+        from scipy import sparse
+        high = db.session.execute(text('SELECT max(id) FROM purchase')).scalar() or 0
+        rows = db.session.execute(text(PAIRS_SQL), {'cap': app.config['RECOMMEND_MAX_ITEMS_PER_CUSTOMER']})
+        pairs = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+        n_customers = (db.session.execute(text('SELECT max(id) FROM customer')).scalar() or 0) + 1
+        n_games = (db.session.execute(text('SELECT max(id) FROM game')).scalar() or 0) + 1
+        shape = (max(n_customers, int(pairs[:, 0].max(initial=0)) + 1),
+                 max(n_games, int(pairs[:, 1].max(initial=0)) + 1))
+        owned = sparse.csr_matrix((np.ones(len(pairs), dtype=np.float32), (pairs[:, 0], pairs[:, 1])), shape=shape)
+        game_ids = np.unique(pairs[:, 1])
+        top = np.full((shape[1], app.config['RECOMMEND_TOP_K']), -1, dtype=np.int32)
+        top[game_ids] = self._similar(owned, game_ids)
+        self.owned, self.top, self.high = owned, top, high
+        self.built = time.monotonic()
+
+    def apply(self, rows):
+        import numpy as np
+        from scipy import sparse
+        customers = np.array([row[-2] for row in rows], dtype=np.int64)
+        games = np.array([row[-1] for row in rows], dtype=np.int64)
+        owned = self.owned
+        shape = (max(owned.shape[0], int(customers.max()) + 1), max(owned.shape[1], int(games.max()) + 1))
+        owned = owned.copy()
+        owned.resize(shape)
+        owned = owned + sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (customers, games)), shape=shape)
+        owned.data[:] = 1
+        affected = np.unique(np.concatenate([games, owned[np.unique(customers)].indices]))
+        top = np.full((shape[1], self.top.shape[1]), -1, dtype=np.int32)
+        top[:self.top.shape[0]] = self.top
+        top[affected] = self._similar(owned, affected)
+        self.owned, self.top = owned, top
+
+    def update(self):
+        with self.updating:
+            if self.high is None or time.monotonic() - self.built >= app.config['RECOMMEND_REBUILD_INTERVAL']:
+                self._rebuild()
+                return
+            threshold = app.config['RECOMMEND_REBUILD_THRESHOLD']
+            rows = db.session.execute(text(NEW_PURCHASES_SQL), {'high': self.high, 'limit': threshold + 1}).all()
+            if len(rows) > threshold:
+                self._rebuild()
+            elif rows:
+                self.apply(rows)
+                self.high = rows[-1].id
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self.checked < app.config['RECOMMEND_REFRESH_INTERVAL'] or self.running:
+            return
+        self.checked = now
+        self.running = True
+
+        def run():
+            try:
+                with app.app_context():
+                    self.update()
+                    db.session.remove()
+            finally:
+                self.running = False
+        threading.Thread(target=run, daemon=True).start()
+
+    def similar(self, game_id):
+        top = self.top
+        if top is None or game_id >= top.shape[0]:
+            return []
+        return [int(other) for other in top[game_id] if other >= 0]
+
+
+recommender = Recommender()
+os.register_at_fork(after_in_child=recommender._after_fork)
+
+
+def recommended_games(game_id):
+    recommender.refresh()
+    ids = recommender.similar(game_id)
+    if not ids:
+        return []
+    found = {game.id: game for game in db.session.query(Game.id, Game.game_name).filter(Game.id.in_(ids))}
+    return [found[other] for other in ids if other in found]
@@ -0,0 +1,125 @@
+import datetime
+import decimal
+from flask import request, jsonify, abort
+from sqlalchemy import text
+from game_store import app, db
+from game_store.users import admin_required
+
+
+app.config.setdefault('REPORT_DEFAULT_DAYS', 30)
+app.config.setdefault('REPORT_TOP_GAMES', 10)
+
+# Sales are summarized per (day, game) in sales_game_day and per day in sales_day, in integer cents at the
+# unit price stored on the purchase, which is what the customer paid or got back; game.price only stands in for
+# a purchase written without one. Triggers, installed by migration 16, add every purchase to the day it was made
+# and every return to the day it was made, so reports read a few thousand summary rows instead of the purchase
+# table. rebuild_reports() recomputes both tables from scratch with set-based GROUP BY statements, for backfills
+# and after changes to the summary rules.
+SALE_CENTS = "CAST(round(coalesce({purchase}.unit_price, game.price) * 100 * {purchase}.qty) AS INTEGER)"
+
+REBUILD_SQL = [
+    'DELETE FROM sales_game_day',
+    'DELETE FROM sales_day',
+    f"""INSERT INTO sales_game_day (day, game_id, units, revenue_cents, returned_units, refunded_cents)
+        SELECT day, game_id, sum(units), sum(revenue_cents), sum(returned_units), sum(refunded_cents) FROM (
+            SELECT date(purchase.date) AS day, purchase.game_id AS game_id, purchase.qty AS units,
+                   {SALE_CENTS.format(purchase='purchase')} AS revenue_cents, 0 AS returned_units, 0 AS refunded_cents
+            FROM purchase JOIN game ON game.id = purchase.game_id
+            UNION ALL
+            SELECT date("return".date), purchase.game_id, 0, 0, purchase.qty, {SALE_CENTS.format(purchase='purchase')}
+            FROM "return" JOIN purchase ON purchase.id = "return".purchase_id AND purchase.status = 'returned'
+            JOIN game ON game.id = purchase.game_id)
+        GROUP BY day, game_id""",
+    """INSERT INTO sales_day (day, units, revenue_cents, returned_units, refunded_cents)
+        SELECT day, sum(units), sum(revenue_cents), sum(returned_units), sum(refunded_cents)
+        FROM sales_game_day GROUP BY day""",
+]
+
+# Dimension -> (group key, group name, joins from game). A game counts toward every platform it runs on.
+DIMENSIONS = {
+    'game': ('game.id', 'game.game_name', ''),
+    'genre': ('game.genre', 'game.genre', ''),
+    'publisher': ('publisher.id', 'publisher.publisher_name', 'JOIN publisher ON publisher.id = game.publisher_id'),
+    'platform': ('platform.id', 'platform.platform_name',
+                 'JOIN run ON run.game_id = game.id JOIN platform ON platform.id = run.platform_id'),
+}
+
+
+def rebuild_reports(connection):
+    for statement in REBUILD_SQL:
+        connection.execute(text(statement))
+
+
+def _money(cents):
+    return str(decimal.Decimal(cents or 0).scaleb(-2))
+
+
+def _date_range():
+    end = request.args.get('to', type=datetime.date.fromisoformat) or datetime.date.today()
+    start = request.args.get('from', type=datetime.date.fromisoformat) \
+        or end - datetime.timedelta(days=app.config['REPORT_DEFAULT_DAYS'] - 1)
+    return {'start': start.isoformat(), 'end': end.isoformat()}
+
+
+def _dimension(default):
+    by = request.args.get('by', default)
+    if by not in DIMENSIONS:
+        abort(400)
+    return by, DIMENSIONS[by]
+
+
+@app.route("/reports/revenue")
+@admin_required
+def revenue_report():
+    dates = _date_range()
+    rows = db.session.execute(text(
+        "SELECT day, units, revenue_cents, returned_units, refunded_cents FROM sales_day "
+        "WHERE day BETWEEN :start AND :end ORDER BY day"), dates)
+    return jsonify(dict(dates, days=[
+        {'day': row.day, 'units': row.units, 'returned_units': row.returned_units,
+         'revenue': _money(row.revenue_cents), 'refunds': _money(row.refunded_cents),
+         'net': _money(row.revenue_cents - row.refunded_cents)} for row in rows]))
+
+
+@app.route("/reports/best-sellers")
+@admin_required
+def best_sellers_report():
+    dates = _date_range()
+    by, (key, name, joins) = _dimension('genre')
+    limit = request.args.get('limit', app.config['REPORT_TOP_GAMES'], type=int)
+    rows = db.session.execute(text(f"""
+        WITH totals AS (
+            SELECT game_id, sum(units) AS units, sum(returned_units) AS returned_units,
+                   sum(revenue_cents) - sum(refunded_cents) AS net_cents
+            FROM sales_game_day WHERE day BETWEEN :start AND :end GROUP BY game_id),
+        ranked AS (
+            SELECT {key} AS group_id, {name} AS group_name, game.id AS game_id, game.game_name AS game_name,
+                   totals.units, totals.returned_units, totals.net_cents,
+                   row_number() OVER (PARTITION BY {key}
+                                      ORDER BY totals.units - totals.returned_units DESC, game.id) AS rank
+            FROM totals JOIN game ON game.id = totals.game_id {joins})
+        SELECT * FROM ranked WHERE rank <= :limit ORDER BY group_name, group_id, rank"""), dict(dates, limit=limit))
+    groups = []
+    for row in rows:
+        if not groups or groups[-1]['id'] != row.group_id:
+            groups.append({'id': row.group_id, 'name': row.group_name, 'games': []})
+        groups[-1]['games'].append({'id': row.game_id, 'name': row.game_name, 'units': row.units,
+                                    'returned_units': row.returned_units, 'net_revenue': _money(row.net_cents)})
+    return jsonify(dict(dates, by=by, groups=groups))
+
+
+# Returns are counted on the day they happen and sales on the day of the purchase, so a range that cuts
+# between a sale and its return shows a slightly skewed rate; over weeks the difference is negligible.
+@app.route("/reports/return-rates")
+@admin_required
+def return_rates_report():
+    dates = _date_range()
+    by, (key, name, joins) = _dimension('genre')
+    rows = db.session.execute(text(f"""
+        SELECT {key} AS group_id, {name} AS group_name, sum(units) AS units, sum(returned_units) AS returned_units
+        FROM sales_game_day JOIN game ON game.id = sales_game_day.game_id {joins}
+        WHERE day BETWEEN :start AND :end
+        GROUP BY {key} ORDER BY group_name, group_id"""), dates)
+    return jsonify(dict(dates, by=by, groups=[
+        {'id': row.group_id, 'name': row.group_name, 'units': row.units, 'returned_units': row.returned_units,
+         'return_rate': row.returned_units / row.units if row.units else None} for row in rows]))
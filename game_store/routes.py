@@ -1,10 +1,25 @@
-from flask import render_template, url_for, flash, redirect, request
-from game_store import app, db, bcrypt
-from game_store.forms import RegistrationForm, LoginForm, BuyForm, ReturnForm, AddMoneyForm
-from game_store.models import Customer, Purchase, Return
+from flask import render_template, url_for, flash, redirect, request, jsonify
+from game_store import app, db
+from game_store.forms import RegistrationForm, LoginForm, BuyForm, CheckoutForm, ReturnForm, AddMoneyForm
+from game_store.models import Customer
 from flask_login import login_user, current_user, logout_user, login_required
-from game_store.models import Game, Publisher, Run, Platform
-import datetime
+from game_store.models import Game, Run
+from game_store.catalog import games_query, catalog_page
+from game_store.history import order_history, return_history
+from game_store.purchases import buy_game, checkout, top_up, refund, returnable_purchase, InsufficientFunds
+from game_store.ledger import credit
+from game_store.jobs import enqueue
+from game_store.passwords import hash_password, authenticate, PasswordHashingBusy
+from sqlalchemy.exc import IntegrityError
+from game_store.users import forget_user
+from game_store.cart import get_cart, add_to_cart, clear_cart
+from game_store.search import search_game_ids, autocomplete
+from game_store.facets import facet_index
+from game_store.cache import catalog_cache, all_publishers, all_platforms, all_genres
+from game_store.pagecache import cached_page
+from game_store.recommend import recommended_games
+from game_store.metrics import local_only
+import uuid
 
 
 @app.route("/")
@@ -19,37 +34,82 @@ def about():
 
 
 @app.route("/gamelist")
+@cached_page
 def gl():
-    publishers = Publisher.query.all()
-    games = Game.query.all()
+    games, next_cursor = catalog_page(games_query(), request.args.get('after'))
+    return render_template('gamelist.html', games=games, next_cursor=next_cursor)
 
-    return render_template('gamelist.html', games=games, publishers=publishers)
+
+@app.route("/catalog")
+def catalog():
+    filters = {
+        'platform': request.args.getlist('platform', type=int),
+        'genre': request.args.getlist('genre'),
+        'publisher': request.args.getlist('publisher', type=int),
+        'price_min': request.args.get('price_min', type=float),
+        'price_max': request.args.get('price_max', type=float),
+        'year_min': request.args.get('year_min', type=int),
+        'year_max': request.args.get('year_max', type=int),
+    }
+    ids, next_cursor, total, counts = facet_index.query(filters, request.args.get('after', type=int),
+                                                         app.config['GAMES_PER_PAGE'])
+    found = {game.id: game for game in games_query().filter(Game.id.in_(ids))}
+    games = [found[game_id] for game_id in ids if game_id in found]
+    return render_template('catalog.html', games=games, next_cursor=next_cursor, total=total, counts=counts,
+                           filters=filters, platforms=all_platforms(), publishers=all_publishers())
 
 
 @app.route("/game/<selected_game>", methods=['GET', 'POST'])
 @login_required
 def game(selected_game):
     form = BuyForm()
+    buying_game = Game.query.filter_by(game_name=selected_game).first_or_404()
     if form.validate_on_submit():
-        game_name = selected_game
-        buying_game = Game.query.filter_by(game_name=game_name).first()
+        if form.add_to_cart.data:
+            add_to_cart(buying_game.id, form.quantity.data)
+            flash('Игра добавлена в корзину', 'success')
+            return redirect(url_for('cart'))
         total_price = form.quantity.data * buying_game.price
-        current_user.balance -= total_price
-        this_purchase = Purchase(customer_id=current_user.id, date=datetime.datetime.now(), game_id=buying_game.id,
-                                 qty=form.quantity.data)
-        db.session.add(this_purchase)
-        # db.session.commit()
-        # flash('your purchase was successful')
-        # return redirect(url_for('account'))
         try:
-            db.session.commit()
+            buy_game(current_user.id, buying_game, form.quantity.data, form.idempotency_key.data or None)
+            forget_user()
             flash('Покупка ' + str(total_price) + ' прошла успешно', 'success')
             return redirect(url_for('account'))
-        except:
-            db.session.rollback()
+        except InsufficientFunds:
             flash('У Вас не хватает денег на счету для этой покупки!', 'warning')
+    if not form.idempotency_key.data:
+        form.idempotency_key.data = uuid.uuid4().hex
+
+    return render_template('game.html', game=selected_game, form=form, title='Game',
+                           recommendations=recommended_games(buying_game.id))
+
+
+@app.route("/cart")
+@login_required
+def cart():
+    form = CheckoutForm()
+    form.idempotency_key.data = uuid.uuid4().hex
+    lines = get_cart()
+    games = Game.query.filter(Game.id.in_(list(lines))).all()
+    total_price = sum(game.price * lines[game.id] for game in games)
+    return render_template('cart.html', games=games, lines=lines, total_price=total_price, form=form, title='Cart')
 
-    return render_template('game.html', game=selected_game, form=form, title='Game')
+
+@app.route("/checkout", methods=['POST'])
+@login_required
+def checkout_cart():
+    form = CheckoutForm()
+    lines = get_cart()
+    if form.validate_on_submit() and lines:
+        try:
+            total_price = checkout(current_user.id, lines, form.idempotency_key.data or None)
+            forget_user()
+            clear_cart()
+            flash('Покупка ' + str(total_price) + ' прошла успешно', 'success')
+            return redirect(url_for('account'))
+        except InsufficientFunds:
+            flash('У Вас не хватает денег на счету для этой покупки!', 'warning')
+    return redirect(url_for('cart'))
 
 
 @app.route("/register", methods=['GET', 'POST'])
@@ -58,9 +118,21 @@ def register():
         return redirect(url_for('home'))
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        try:
+            hashed_password = hash_password(form.password.data)
+        except PasswordHashingBusy:
+            flash('Сервер перегружен, попробуйте через несколько секунд', 'warning')
+            return render_template('register.html', title='Register', form=form), 503, {'Retry-After': '5'}
         user = Customer(username=form.username.data, email=form.email.data, password=hashed_password, balance=40.00)
         db.session.add(user)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            form.check_unique()
+            return render_template('register.html', title='Register', form=form)
+        credit(user.id, user.balance, 'opening')
+        enqueue('welcome', {'customer_id': user.id, 'balance': f'{user.balance:.2f}'})
         db.session.commit()
         flash('Аккаунт создан! Теперь возможен вход', 'success')
         return redirect(url_for('login'))
@@ -73,8 +145,12 @@ def login():
         return redirect(url_for('home'))
     form = LoginForm()
     if form.validate_on_submit():
-        user = Customer.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        try:
+            user = authenticate(form.email.data, form.password.data)
+        except PasswordHashingBusy:
+            flash('Сервер перегружен, попробуйте через несколько секунд', 'warning')
+            return render_template('login.html', title='Login', form=form), 503, {'Retry-After': '5'}
+        if user:
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('home'))
@@ -86,6 +162,7 @@ def login():
 @app.route("/logout")
 def logout():
     logout_user()
+    forget_user()
     return redirect(url_for('home'))
 
 
@@ -94,63 +171,88 @@ def logout():
 def account():
     form = AddMoneyForm()
     if form.validate_on_submit():
-        current_user.balance += 20
-        db.session.commit()
+        top_up(current_user.id, 20)
+        forget_user()
         return redirect(url_for('account'))
 
-    orders = Purchase.query.all()
-    games = Game.query.all()
-    returns = Return.query.all()
-    return render_template('account.html', orders=orders, games=games, returns=returns, form=form)
+    orders, orders_before = order_history(current_user.id, request.args.get('orders_before', type=int))
+    returns, returns_before = return_history(current_user.id, request.args.get('returns_before', type=int))
+    return render_template('account.html', orders=orders, orders_before=orders_before, returns=returns,
+                           returns_before=returns_before, form=form)
 
-@app.route("/returns/<selected_purchase>", methods=['GET', 'POST'])
+@app.route("/returns/<int:selected_purchase>", methods=['GET', 'POST'])
+@login_required
 def returns(selected_purchase):
     form = ReturnForm()
-    purchase = Purchase.query.filter_by(id=selected_purchase).first()
-    purchased_game_id = purchase.game_id
-    purchased_game = Game.query.filter_by(id=purchased_game_id).first()
-    total_spent = purchased_game.price * purchase.qty
+    purchase = returnable_purchase(current_user.id, selected_purchase)
+    if purchase is None:
+        flash('Заказ не найден или уже возвращён', 'info')
+        return redirect(url_for('account'))
 
     if form.validate_on_submit():
-        thereturn = Return(current_user.id, datetime.datetime.now(), selected_purchase)
-        db.session.add(thereturn)
-        current_user.balance += total_spent
-        db.session.commit()
+        amount = refund(current_user.id, selected_purchase)
+        forget_user()
+        if amount is not None:
+            flash('Возврат ' + str(amount) + ' выполнен', 'success')
         return redirect(url_for('account'))
 
-    return render_template('returns.html', form=form, title='Returns')
+    return render_template('returns.html', form=form, purchase=purchase, title='Returns')
 
 @app.route("/publisher")
+@cached_page
 def publish():
-    publishers = Publisher.query.all()
-    return render_template('publisher.html', publishers=publishers)
+    return render_template('publisher.html', publishers=all_publishers())
 
 @app.route('/show_publisher/<selected_publisher>')
+@cached_page
 def selected_publisher(selected_publisher):
-    publishers = Publisher.query.all()
-    games = Game.query.filter_by(publisher_id=selected_publisher)
-    return render_template('gamelist.html', games=games, publishers=publishers)
+    query = games_query().filter(Game.publisher_id == selected_publisher)
+    games, next_cursor = catalog_page(query, request.args.get('after'))
+    return render_template('gamelist.html', games=games, next_cursor=next_cursor)
 
 @app.route("/platforms")
+@cached_page
 def platform():
-    platforms = Platform.query.all()
-    return render_template('platforms.html', platforms=platforms)
+    return render_template('platforms.html', platforms=all_platforms())
 
 @app.route('/show_platform/<selected_platform>')
+@cached_page
 def selected_platform(selected_platform):
-    runs = Run.query.filter_by(platform_id = selected_platform).all()
-    publishers = Publisher.query.all()
-    games = Game.query.filter(Game.runs.any(platform_id=selected_platform))
-    return render_template('gamelist.html', games=games, publishers=publishers, run=runs)
+    query = games_query().join(Run, Run.game_id == Game.id).filter(Run.platform_id == selected_platform)
+    games, next_cursor = catalog_page(query, request.args.get('after'), key=(Run.release_date, Run.game_id))
+    return render_template('gamelist.html', games=games, next_cursor=next_cursor)
 
 @app.route("/genres")
+@cached_page
 def genre():
-    games = db.session.query(Game).distinct(Game.genre).group_by(Game.genre)
-    return render_template('genres.html', games=games)
+    return render_template('genres.html', genres=all_genres())
 
 @app.route('/show_genre/<selected_genre>')
+@cached_page
 def selected_genre(selected_genre):
-    games = Game.query.filter_by(genre=selected_genre)
-    return render_template('gamelist.html', games=games)
+    query = games_query().filter(Game.genre == selected_genre)
+    games, next_cursor = catalog_page(query, request.args.get('after'))
+    return render_template('gamelist.html', games=games, next_cursor=next_cursor)
+
+
+@app.route("/search")
+def search():
+    limit = app.config['SEARCH_RESULTS_LIMIT']
+    offset = request.args.get('after', 0, type=int)
+    ids = search_game_ids(request.args.get('q', ''), limit + 1, offset)
+    found = {game.id: game for game in games_query().filter(Game.id.in_(ids[:limit]))}
+    games = [found[game_id] for game_id in ids[:limit] if game_id in found]
+    next_cursor = offset + limit if len(ids) > limit else None
+    return render_template('gamelist.html', games=games, next_cursor=next_cursor)
+
+
+@app.route("/search/autocomplete")
+def search_autocomplete():
+    return jsonify(autocomplete(request.args.get('q', '')))
 
 
+@app.route("/cache-stats")
+@local_only
+def cache_stats():
+    """Catalog cache figures of the worker process that answers, not of the whole server."""
+    return jsonify(catalog_cache.stats())
@@ -0,0 +1,64 @@
+import re
+from sqlalchemy import text
+from game_store import app, db
+
+
+app.config.setdefault('SEARCH_RESULTS_LIMIT', 20)
+app.config.setdefault('AUTOCOMPLETE_LIMIT', 10)
+
+# game_fts is an external-content FTS5 index over game(game_name, description): it stores only the inverted
+# index and reads the text back from game. The triggers keep it in step with every write to game, including
+# the bulk upserts of import-catalog. prefix='2 3' indexes short prefixes so type-ahead is an index lookup.
+SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS game_fts USING fts5(
+        game_name, description, content='game', content_rowid='id',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS game_fts_ai AFTER INSERT ON game BEGIN
+        INSERT INTO game_fts(rowid, game_name, description) VALUES (new.id, new.game_name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_fts_ad AFTER DELETE ON game BEGIN
+        INSERT INTO game_fts(game_fts, rowid, game_name, description)
+        VALUES ('delete', old.id, old.game_name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS game_fts_au AFTER UPDATE OF game_name, description ON game BEGIN
+        INSERT INTO game_fts(game_fts, rowid, game_name, description)
+        VALUES ('delete', old.id, old.game_name, old.description);
+        INSERT INTO game_fts(rowid, game_name, description) VALUES (new.id, new.game_name, new.description);
+    END""",
+]
+
+
+def install_search(connection):
+    for statement in SEARCH_DDL:
+        connection.execute(text(statement))
+    connection.execute(text("INSERT INTO game_fts(game_fts) VALUES ('rebuild')"))
+
+
+def match_expression(query, column=None):
+    terms = re.findall(r'\w+', query.lower())
+    if not terms:
+        return None
+    expression = ' '.join(f'"{term}"*' for term in terms)
+    return f'{column} : ({expression})' if column else expression
+
+
+def search_game_ids(query, limit=None, offset=0):
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    rows = db.session.execute(text(
+        "SELECT rowid FROM game_fts WHERE game_fts MATCH :expression "
+        "ORDER BY bm25(game_fts, 10.0, 1.0) LIMIT :limit OFFSET :offset"),
+        {'expression': expression, 'limit': limit or app.config['SEARCH_RESULTS_LIMIT'], 'offset': offset})
+    return [row.rowid for row in rows]
+
+
+def autocomplete(query, limit=None):
+    expression = match_expression(query, column='game_name')
+    if expression is None:
+        return []
+    rows = db.session.execute(text(
+        "SELECT game.id, game.game_name FROM game_fts JOIN game ON game.id = game_fts.rowid "
+        "WHERE game_fts MATCH :expression ORDER BY bm25(game_fts, 10.0, 1.0) LIMIT :limit"),
+        {'expression': expression, 'limit': limit or app.config['AUTOCOMPLETE_LIMIT']})
+    return [{'id': row.id, 'game_name': row.game_name} for row in rows]
@@ -0,0 +1,99 @@
+"""Production server: preloads the app once, then forks worker processes that share its listening socket.
+
+    python -m game_store.server --workers 4 --bind 0.0.0.0:8000
+
+Each worker serves one request at a time, or one thread per request with --threaded, which keeps catalog pages
+moving while logins wait for a password hashing slot; run about one worker per core. Workers that die are
+replaced. SIGTERM or SIGINT stops the workers and then the server.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+from werkzeug.serving import make_server
+from game_store import create_app, db
+from game_store.facets import facet_index
+from game_store.passwords import password_hasher
+from game_store.posters import poster_fetcher
+from game_store.recommend import recommender
+
+
+# Everything built here before the fork is shared copy-on-write by every worker instead of being built once per
+# worker on its first requests: the facet bitsets, the recommendation table, the poster map and the compiled
+# templates. The password hashing slots are created here too, so all workers share one machine-wide cap. The
+# engine is disposed afterwards, so no worker inherits an open SQLite connection.
+def preload(app):
+    password_hasher.start()
+    with app.app_context():
+        facet_index.refresh()
+        recommender.rebuild()
+        poster_fetcher.load()
+        db.session.remove()
+    for name in app.jinja_loader.list_templates():
+        app.jinja_env.get_template(name)
+    db.get_engine(app).dispose()
+
+
+def _worker(server):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def serve(app, host, port, workers, threaded=False):
+    server = make_server(host, port, app, threaded=threaded)
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _worker(server)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f'serving on http://{host}:{port} with {workers} workers', file=sys.stderr)
+    while children:
+        pid, status = os.wait()
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f'worker {pid} exited with status {status}, replacing it', file=sys.stderr)
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        spawn()
+    server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:port to listen on.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threaded', action='store_true', help='Serve the requests of a worker in threads.')
+    parser.add_argument('--config', default=os.environ.get('GAME_STORE_CONFIG', 'game_store.config.ProductionConfig'))
+    parser.add_argument('--access-log', action='store_true', help='Log every request to stderr.')
+    args = parser.parse_args()
+    host, _, port = args.bind.rpartition(':')
+    if not args.access_log:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app = create_app(args.config)
+    preload(app)
+    serve(app, host or '127.0.0.1', int(port), args.workers, args.threaded)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import decimal
+import functools
+import os
+import time
+from flask import session, abort
+from flask_login import UserMixin, current_user, login_required
+from game_store import app, db
+from game_store.ledger import balance
+from game_store.models import Customer
+
+
+app.config.setdefault('USER_CACHE_ENABLED', True)
+app.config.setdefault('USER_CACHE_TTL', 60)
+app.config.setdefault('ADMIN_EMAILS', [email for email in os.environ.get('GAME_STORE_ADMIN_EMAILS', '').split(',')
+                                       if email])
+
+
+# The identity of the logged-in customer is kept in the signed session cookie, so an authenticated page view
+# does not need a customer lookup. The cached balance is for display only: every money operation appends a
+# ledger entry whose balance check runs inside its own statement (see ledger.py) and then calls forget_user(),
+# so the next request loads a fresh snapshot.
+class CachedCustomer(UserMixin):
+    def __init__(self, id, username, email, balance):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.balance = balance
+
+    def __repr__(self):
+        return f"CachedCustomer('{self.username}', '{self.email}', '{self.balance}')"
+
+
+def remember_user(customer, balance):
+    session['_customer'] = {'id': customer.id, 'username': customer.username, 'email': customer.email,
+                            'balance': str(balance), 'loaded': time.time()}
+
+
+def forget_user():
+    session.pop('_customer', None)
+
+
+def load_cached_user(user_id):
+    snapshot = session.get('_customer')
+    if (app.config['USER_CACHE_ENABLED'] and snapshot and snapshot['id'] == user_id
+            and time.time() - snapshot['loaded'] < app.config['USER_CACHE_TTL']):
+        return CachedCustomer(snapshot['id'], snapshot['username'], snapshot['email'],
+                              decimal.Decimal(snapshot['balance']))
+    customer = db.session.get(Customer, user_id)
+    if customer is None:
+        forget_user()
+        return None
+    current_balance = balance(customer.id)
+    remember_user(customer, current_balance)
+    return CachedCustomer(customer.id, customer.username, customer.email, current_balance)
+
+
+# For store staff pages: the logged-in customer's email has to be listed in ADMIN_EMAILS
+# (GAME_STORE_ADMIN_EMAILS, comma separated).
+def admin_required(view):
+    @functools.wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.email not in app.config['ADMIN_EMAILS']:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
@@ -1,4 +1,6 @@
-from game_store import app
+from game_store import create_app
+
+app = create_app('game_store.config.DevelopmentConfig')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run()